@@ -0,0 +1,46 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps_bytes(data, default=None):
+    """
+    Encodes the data as compact UTF-8 JSON, using orjson when available. \n
+    Datetimes, dates and times are encoded by `default` and non string keys are coerced to strings, as json does.
+    """
+    if default is None:
+        default = DjangoJSONEncoder().default
+
+    if orjson is not None:
+        # datetimes are left to `default` to keep the format of the json encoders, e.g. milliseconds and `Z`
+        return orjson.dumps(data,
+                            default=default,
+                            option=orjson.OPT_PASSTHROUGH_DATETIME
+                            | orjson.OPT_NON_STR_KEYS)
+
+    return json.dumps(data,
+                      default=default,
+                      ensure_ascii=False,
+                      separators=(',', ':')).encode()
+
+
+def dumps(data, default=None):
+    """
+    Encodes the data as a compact JSON string, using orjson when available
+    """
+    return dumps_bytes(data, default).decode()
+
+
+def loads(data):
+    """
+    Decodes a JSON string or bytes, using orjson when available
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+
+    return json.loads(data)
@@ -0,0 +1,53 @@
+import asyncio
+
+from redis import ConnectionPool, Redis
+from redis.asyncio import BlockingConnectionPool
+from redis.asyncio import Redis as AsyncRedis
+
+from DatingAppBackend import settings
+
+_async_redis = None
+
+_async_redis_loop = None
+
+_redis = None
+
+
+def get_async_redis():
+    """
+    Gets the process-wide asyncio Redis client shared by the websocket consumers. \n
+    The connection pool is created lazily on the running event loop and holds at most `REDIS_POOL_SIZE` connections,
+    callers wait for a free connection once all of them are in use.
+    """
+    global _async_redis, _async_redis_loop
+
+    loop = asyncio.get_event_loop()
+
+    if _async_redis is None or _async_redis_loop is not loop:
+        _async_redis = AsyncRedis(connection_pool=BlockingConnectionPool(
+            host=settings.REDIS_HOST,
+            port=int(settings.REDIS_PORT),
+            max_connections=settings.REDIS_POOL_SIZE,
+            timeout=settings.REDIS_POOL_TIMEOUT,
+            health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+            decode_responses=True))
+        _async_redis_loop = loop
+
+    return _async_redis
+
+
+def get_redis():
+    """
+    Gets the process-wide Redis client used by synchronous code such as Celery tasks, created lazily
+    """
+    global _redis
+
+    if _redis is None:
+        _redis = Redis(connection_pool=ConnectionPool(
+            host=settings.REDIS_HOST,
+            port=int(settings.REDIS_PORT),
+            max_connections=settings.REDIS_POOL_SIZE,
+            health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+            decode_responses=True))
+
+    return _redis
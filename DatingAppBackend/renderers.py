@@ -0,0 +1,40 @@
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from DatingAppBackend import fast_json
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSON Renderer encoding with orjson when available, falls back to the default renderer otherwise
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+
+        renderer_context = renderer_context or {}
+
+        if fast_json.orjson is None or data is None or self.get_indent(
+                accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+
+        ret = fast_json.dumps_bytes(data, default=self.encoder_class().default)
+
+        # escape the line separators as the default renderer does to keep the output valid JavaScript
+        return ret.replace(b'\xe2\x80\xa8',
+                           b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class FastJSONParser(JSONParser):
+    """
+    JSON Parser decoding with orjson when available, falls back to the default parser otherwise
+    """
+    def parse(self, stream, media_type=None, parser_context=None):
+
+        if fast_json.orjson is None:
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return fast_json.loads(stream.read())
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
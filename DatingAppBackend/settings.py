@@ -11,6 +11,8 @@ https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
 from pathlib import Path
+import os
+import tempfile
 import environ
 from datetime import timedelta
 import cloudinary
@@ -87,10 +89,156 @@ ASGI_APPLICATION = 'DatingAppBackend.routing.application'
 REDIS_HOST = ENV('REDIS_HOST')
 REDIS_PORT = ENV('REDIS_PORT')
 
+# Process-wide Redis connection pool shared by the websocket consumers and Celery tasks
+
+REDIS_POOL_SIZE = ENV.int('REDIS_POOL_SIZE', default=50)
+
+# Seconds to wait for a free connection once all connections of the pool are in use
+
+REDIS_POOL_TIMEOUT = 5
+
+# Seconds after which an idle connection is checked before being reused
+
+REDIS_HEALTH_CHECK_INTERVAL = 30
+
+# Seconds after which a connected device of an online user is considered gone unless its heartbeat is renewed,
+# devices gone that way are swept every `PRESENCE_TTL / 2` seconds
+
+PRESENCE_TTL = 60
+
+# Cache of authenticated users, kept in process and optionally shared through Redis
+
+USER_CACHE_SIZE = 10000
+
+USER_CACHE_TTL = 30
+
+USER_CACHE_REDIS = ENV.bool('USER_CACHE_REDIS', default=False)
+
+# Seconds between logs of the hit counters and hit ratio of the cache of users
+
+USER_CACHE_STATS_INTERVAL = 300
+
+# Discovery candidate sets of users expire after `DISCOVERY_TTL` seconds and are rebuilt in background
+# when read `DISCOVERY_REFRESH_AFTER` seconds after being built
+
+DISCOVERY_TTL = 3600
+
+DISCOVERY_REFRESH_AFTER = 600
+
+# Seconds after which a queued or running build of a candidate set is considered lost and queued again
+
+DISCOVERY_BUILD_TIMEOUT = 120
+
+# Number of candidates read from the database and added to Redis at once while building a candidate set
+
+DISCOVERY_BUILD_BATCH_SIZE = 10000
+
+# Default, minimum and maximum radius (in kilometers) of searches for nearby users
+
+NEARBY_DEFAULT_RADIUS = 50
+
+NEARBY_MIN_RADIUS = 1
+
+NEARBY_MAX_RADIUS = 500
+
+# Step in degrees of the grid locations of users are snapped to before being stored, about 1.1 km of latitude,
+# so that searches with small radii cannot be used to find their precise positions
+
+LOCATION_GRID = 0.01
+
+# Maximum number of usernames checked at once by the bulk has-liked endpoint
+
+HAS_LIKED_MAX_USERNAMES = 1000
+
+# Storage photos are uploaded to, `accounts.storage.LocalStorage` keeps them in `PHOTO_LOCAL_ROOT` instead of Cloudinary
+
+PHOTO_STORAGE = ENV('PHOTO_STORAGE',
+                    default='accounts.storage.CloudinaryStorage')
+
+PHOTO_LOCAL_ROOT = BASE_DIR / 'photos'
+
+PHOTO_LOCAL_URL = ENV('PHOTO_LOCAL_URL', default='/photos/')
+
+# Directory photos are kept in while waiting to be uploaded in background
+
+PHOTO_UPLOAD_DIR = ENV('PHOTO_UPLOAD_DIR',
+                       default=os.path.join(tempfile.gettempdir(),
+                                            'photo_uploads'))
+
+# Number of retries and seconds between them of failed uploads and removals of photos
+
+PHOTO_UPLOAD_MAX_RETRIES = 5
+
+PHOTO_UPLOAD_RETRY_DELAY = 30
+
+# Maximum size in bytes and width or height in pixels of uploaded photos
+
+PHOTO_MAX_SIZE = 10 * 1024 * 1024
+
+PHOTO_MAX_DIMENSION = 8000
+
+# Maximum number of leading bytes of uploaded photos buffered to find their format and dimensions, e.g. past the
+# metadata of JPEG exports
+
+PHOTO_SNIFF_SIZE = 256 * 1024
+
+# Number of photos of each user included in user responses asked to include photos
+
+PROFILE_PHOTOS_LIMIT = 6
+
+# Profile photo URLs are checked by `URL_VALIDATION_WORKERS` threads with at most `URL_VALIDATION_MAX_PENDING`
+# checks running or queued, each given `URL_VALIDATION_TIMEOUT` seconds
+
+URL_VALIDATION_WORKERS = 8
+
+URL_VALIDATION_MAX_PENDING = 64
+
+URL_VALIDATION_TIMEOUT = 3
+
+# Seconds for which valid and invalid profile photo URLs are remembered
+
+URL_VALIDATION_CACHE_TTL = 86400
+
+URL_VALIDATION_NEGATIVE_CACHE_TTL = 300
+
 # Celery configurations
 
 CELERY_BROKER_URL = ENV('CELERY_BROKER_URL')
 
+# Number of chat messages inserted per query while syncing chats with the database
+
+CHAT_DB_BATCH_SIZE = 500
+
+# Seconds for which serialized profiles of users shown in chat feeds are cached
+
+PROFILE_CACHE_TTL = 300
+
+# Number of buffered messages or chat feed entries sent per frame when replaying them in bulk on connect
+
+SYNC_CHUNK_SIZE = 500
+
+# Buffered chat messages of a chat room are synced with the database once there are `CHAT_FLUSH_MAX_MESSAGES`
+# of them or the oldest of them is `CHAT_FLUSH_MAX_AGE` seconds old
+
+CHAT_FLUSH_MAX_MESSAGES = 200
+
+CHAT_FLUSH_MAX_AGE = 60
+
+# Seconds after which a queued or running sync of a chat room is considered lost
+
+CHAT_FLUSH_TIMEOUT = 300
+
+CELERY_BEAT_SCHEDULE = {
+    'flush-chat-rooms': {
+        'task': 'chat.tasks.flush_chat_rooms',
+        'schedule': CHAT_FLUSH_MAX_AGE / 2,
+    },
+    'sweep-presence': {
+        'task': 'accounts.tasks.sweep_presence',
+        'schedule': PRESENCE_TTL / 2,
+    },
+}
+
 CHANNEL_LAYERS = {
     "default": {
         "BACKEND": "channels_redis.core.RedisChannelLayer",
@@ -141,6 +289,15 @@ REST_FRAMEWORK = {
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ],
     'DATE_INPUT_FORMATS': ['iso-8601', '%Y-%m-%dT%H:%M:%S.%fZ'],
+    'DEFAULT_RENDERER_CLASSES': [
+        'DatingAppBackend.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'DatingAppBackend.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
 AUTH_USER_MODEL = 'accounts.User'
@@ -186,6 +343,31 @@ LOGGING = {
             'level': 'DEBUG',
             'propagate': True,
         },
+        'accounts.user_cache': {
+            'handlers': ['file'],
+            'level': 'INFO',
+            'propagate': True,
+        },
+        'accounts.tasks': {
+            'handlers': ['file'],
+            'level': 'INFO',
+            'propagate': True,
+        },
+        'chat.tasks': {
+            'handlers': ['file'],
+            'level': 'INFO',
+            'propagate': True,
+        },
+        'accounts.presence': {
+            'handlers': ['file'],
+            'level': 'INFO',
+            'propagate': True,
+        },
+        'accounts.discovery': {
+            'handlers': ['file'],
+            'level': 'INFO',
+            'propagate': True,
+        },
     },
 }
 
@@ -0,0 +1,28 @@
+import uuid
+from datetime import date, datetime, timezone
+
+from django.test import SimpleTestCase
+from rest_framework.renderers import JSONRenderer
+
+from DatingAppBackend.renderers import FastJSONRenderer
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    """
+    Checks that the fast renderer keeps the output of the default renderer
+    """
+    def test_output_matches_json_renderer(self):
+        data = {
+            'lastActive':
+            datetime(2021, 5, 4, 3, 2, 1, 123456, tzinfo=timezone.utc),
+            'dateOfBirth': date(1990, 1, 2),
+            'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+            'messages': [{
+                'content': 'line\u2028separator',
+                'seen': True
+            }],
+            1: 'non string key',
+        }
+
+        self.assertEqual(FastJSONRenderer().render(data),
+                         JSONRenderer().render(data))
@@ -0,0 +1,107 @@
+from DatingAppBackend import fast_json
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# websocket subprotocol of the compact binary frames
+MSGPACK_SUBPROTOCOL = 'msgpack.v1'
+
+# short codes of the fields of binary frames
+FIELD_CODES = {
+    'type': 't',
+    'data': 'd',
+    'chat_message': 'cm',
+    'chat_room': 'cr',
+    'chat_rooms': 'crs',
+    'messages': 'ms',
+    'other_user': 'ou',
+    'seen': 'sn',
+    'user_available': 'ua',
+    'user_not_available': 'una',
+    'status': 'st',
+    'last_active': 'la',
+    'content': 'c',
+    'messageType': 'mt',
+    'sender': 'sd',
+    'recipient': 'rc',
+    'createdAt': 'ca',
+    'chatRoomName': 'rn',
+    'lastChatMessage': 'lm',
+    'firstUser': 'u1',
+    'secondUser': 'u2',
+    'username': 'un',
+    'introduction': 'in',
+    'gender': 'g',
+    'interests': 'it',
+    'city': 'ci',
+    'country': 'co',
+    'age': 'a',
+    'firstName': 'fn',
+    'lastName': 'ln',
+    'dateOfBirth': 'db',
+    'lastActive': 'lac',
+    'mainPhoto': 'mp',
+    'lookingFor': 'lf',
+}
+
+FIELD_NAMES = {code: name for name, code in FIELD_CODES.items()}
+
+
+def rename_fields(value, names):
+    """
+    Renames the keys of the dictionaries nested in the value, keys without a new name are kept
+    """
+    if isinstance(value, dict):
+        return {
+            names.get(key, key): rename_fields(item, names)
+            for key, item in value.items()
+        }
+
+    if isinstance(value, list):
+        return [rename_fields(item, names) for item in value]
+
+    return value
+
+
+class FrameConsumerMixin:
+    """
+    Mixin for websocket consumers exchanging JSON text frames or, if the client negotiates the
+    `msgpack.v1` subprotocol, MessagePack binary frames with short field codes
+    """
+
+    binary_frames = False
+
+    async def accept_frames(self):
+        """
+        Accepts the connection, selecting the binary subprotocol if the client offers it
+        """
+        if msgpack is not None and MSGPACK_SUBPROTOCOL in self.scope.get(
+                'subprotocols', []):
+            self.binary_frames = True
+            await self.accept(subprotocol=MSGPACK_SUBPROTOCOL)
+        else:
+            await self.accept()
+
+    async def send_frame(self, data):
+        """
+        Sends the data in the negotiated format
+        """
+        if self.binary_frames:
+            await self.send(
+                bytes_data=msgpack.packb(rename_fields(data, FIELD_CODES)))
+        else:
+            await self.send(text_data=fast_json.dumps(data))
+
+    def decode_frame(self, text_data=None, bytes_data=None):
+        """
+        Decodes a frame received in the negotiated format, returns None for frames in any other format
+        """
+        if self.binary_frames and bytes_data is not None:
+            return rename_fields(msgpack.unpackb(bytes_data), FIELD_NAMES)
+
+        if not self.binary_frames and text_data is not None:
+            return fast_json.loads(text_data)
+
+        return None
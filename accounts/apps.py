@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+
+        from accounts.models import User
+        from accounts.user_cache import invalidate_saved_user
+
+        post_save.connect(invalidate_saved_user, sender=User)
+        post_delete.connect(invalidate_saved_user, sender=User)
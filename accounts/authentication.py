@@ -4,7 +4,7 @@ import jwt
 
 from DatingAppBackend import settings
 
-from accounts.models import User
+from accounts import user_cache
 
 
 class CustomAuthentication(authentication.BaseAuthentication):
@@ -35,7 +35,7 @@ class CustomAuthentication(authentication.BaseAuthentication):
         except Exception as e:
             raise NotAuthenticated(e)
 
-        user = User.objects.filter(id=payload['user_id']).first()
+        user = user_cache.get_user(payload['user_id'])
 
         if user is None:
             raise NotFound('User not found')
@@ -1,21 +1,28 @@
-from caches import Cache
+import asyncio
 from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
-import json
 from django.contrib.auth.models import AnonymousUser
 from django.utils import timezone
 
 from accounts.models import User
 
+from accounts.presence import Presence
+
 from DatingAppBackend import settings
 
+from DatingAppBackend.redis_pool import get_async_redis
+
+from DatingAppBackend.wire import FrameConsumerMixin
+
 
-class StatusConsumer(AsyncWebsocketConsumer):
+class StatusConsumer(FrameConsumerMixin, AsyncWebsocketConsumer):
     """
     Consumer to handle online status of authenticated Users
     """
     def __init__(self):
-        self.device_count_cache = Cache("redis://" + settings.REDIS_HOST)
+        self.redis = get_async_redis()
+        self.presence = Presence(self.redis)
+        self.presence_heartbeat = None
         self.is_user_authenticated = False
         super().__init__()
 
@@ -41,35 +48,36 @@ class StatusConsumer(AsyncWebsocketConsumer):
     # Add current device of the User
     async def add_device(self):
 
-        count = await self.device_count_cache.get(self.user_device_count)
+        # once the devices expire without being removed the watchers are told the User went offline
+        changes = [(self.user_device_count, 1, {
+            'group': self.user_group_name,
+            'event': {
+                'type': 'time'
+            },
+            'last_active': self.user_name
+        })]
 
-        if count is None:
-            await self.device_count_cache.set(self.user_device_count, 1)
-            count = 1
-        else:
-            await self.device_count_cache.set(self.user_device_count,
-                                              count + 1)
-            count += 1
+        count, = await self.presence.update(self.channel_name, changes)
+
+        self.presence_heartbeat = asyncio.ensure_future(
+            self.presence.keep_alive(self.channel_name, changes))
 
         await self.send_status(count)
 
     # Remove current device of the User
     async def remove_device(self):
 
-        count = await self.device_count_cache.get(self.user_device_count)
-
-        if count is not None:
-            if count <= 1:
-                await self.device_count_cache.delete(self.user_device_count)
-                count = None
-                last_active_time = timezone.now()
-                await self.update_last_active(last_active_time)
-                self.last_active_time = last_active_time.isoformat()
-                await self.send_status(count)
-            else:
-                await self.device_count_cache.set(self.user_device_count,
-                                                  count - 1)
-                count -= 1
+        if self.presence_heartbeat is not None:
+            self.presence_heartbeat.cancel()
+
+        count = await self.presence.remove(self.user_device_count,
+                                          self.channel_name)
+
+        if count == 0:
+            last_active_time = timezone.now()
+            await self.update_last_active(last_active_time)
+            self.last_active_time = last_active_time.isoformat()
+            await self.send_status(count)
 
     # Send the target User's status
     async def send_status(self, count):
@@ -107,41 +115,36 @@ class StatusConsumer(AsyncWebsocketConsumer):
         await self.channel_layer.group_add(self.user_group_name,
                                            self.channel_name)
 
-        await self.accept()
-
-        await self.device_count_cache.connect()
+        await self.accept_frames()
 
         if self.scope['user'] != AnonymousUser and \
             self.scope['user'].username == self.user_name:
             self.is_user_authenticated = True
             await self.add_device()
         else:
-            count = await self.device_count_cache.get(self.user_device_count)
+            count = await self.presence.count(self.user_device_count)
             await self.send_status(count)
 
     async def status(self, event):
         device_count = event['device_count']
 
-        await self.send(text_data=json.dumps(
-            {
-                'type': 'status',
-                'status': 'online' if device_count > 0 else None
-            }))
+        await self.send_frame({
+            'type': 'status',
+            'status': 'online' if device_count > 0 else None
+        })
 
     async def time(self, event):
         last_active = event['last_active']
 
-        await self.send(text_data=json.dumps({
+        await self.send_frame({
             'type': 'time',
             'last_active': last_active
-        }))
+        })
 
     # Disconnect the client from the target User's group and remove device if the client is target User
     async def disconnect(self, close_code):
         if self.is_user_authenticated:
             await self.remove_device()
 
-        await self.device_count_cache.disconnect()
-
         await self.channel_layer.group_discard(self.user_group_name,
                                                self.channel_name)
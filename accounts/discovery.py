@@ -0,0 +1,246 @@
+import base64
+import binascii
+import logging
+import time
+from datetime import datetime, timezone
+
+from django.db.models import Q
+from rest_framework import pagination
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from DatingAppBackend import settings
+from DatingAppBackend.redis_pool import get_redis
+
+from accounts.models import Likes, User
+from accounts.pagination import filter_users, get_preferences
+from accounts.serializers import USER_VALUES
+
+logger = logging.getLogger(__name__)
+
+
+def candidates_key(user_id, gender, min_age, max_age):
+    """
+    Gets the Redis key of the candidate set of a `User` for the given preferences
+    """
+    return 'discovery_{0}_{1}_{2}_{3}'.format(
+        user_id, gender or '', '' if min_age is None else min_age,
+        '' if max_age is None else max_age)
+
+
+def candidate_keys_key(user_id):
+    """
+    Gets the Redis key of the set of candidate set keys built for a `User`
+    """
+    return 'discovery_{0}_keys'.format(user_id)
+
+
+def get_candidates(user_id, gender, min_age, max_age):
+    """
+    Gets the active non-staff `User`s not yet liked by the `User` matching the preferences, most recently active first
+    """
+    queryset = User.objects.filter(is_staff=False, is_active=True).exclude(
+        id=user_id).exclude(id__in=Likes.objects.filter(
+            liked_by=user_id).values('liked_on'))
+
+    return filter_users(queryset, gender, min_age,
+                        max_age).order_by('-last_active', '-id')
+
+
+def encode_cursor(last_active, id):
+    """
+    Encodes the (last_active, id) key of a candidate into an opaque cursor
+    """
+    key = last_active.isoformat() + '|' + str(id)
+    return base64.urlsafe_b64encode(key.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Decodes an opaque cursor into the (last_active, id) key of a candidate
+    """
+    try:
+        last_active, id = base64.urlsafe_b64decode(
+            cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(last_active), int(id)
+    except (ValueError, UnicodeError, binascii.Error):
+        raise serializers.ValidationError(
+            {'cursor': ["Invalid cursor provided"]})
+
+
+def build_candidates(user_id, gender, min_age, max_age):
+    """
+    Builds the candidate set of a `User` as a sorted set of `User` ids scored by last activity. \n
+    The set is built under a temporary key and swapped in atomically.
+    """
+    redis = get_redis()
+
+    key = candidates_key(user_id, gender, min_age, max_age)
+    building_key = key + '_building_set'
+
+    redis.delete(building_key)
+
+    candidates = get_candidates(user_id, gender, min_age,
+                                max_age).values_list('id', 'last_active')
+
+    batch = {}
+
+    for id, last_active in candidates.iterator(
+            chunk_size=settings.DISCOVERY_BUILD_BATCH_SIZE):
+        batch[id] = last_active.timestamp()
+
+        if len(batch) >= settings.DISCOVERY_BUILD_BATCH_SIZE:
+            redis.zadd(building_key, batch)
+            batch = {}
+
+    if len(batch) > 0:
+        redis.zadd(building_key, batch)
+
+    pipe = redis.pipeline()
+
+    if redis.exists(building_key):
+        pipe.rename(building_key, key)
+        pipe.expire(key, settings.DISCOVERY_TTL)
+    else:
+        pipe.delete(key)
+
+    pipe.set(key + '_built', time.time(), ex=settings.DISCOVERY_TTL)
+    pipe.sadd(candidate_keys_key(user_id), key)
+    pipe.expire(candidate_keys_key(user_id), settings.DISCOVERY_TTL)
+    pipe.execute()
+
+
+def remove_candidate(user_id, candidate_id):
+    """
+    Removes a `User` from all candidate sets of another `User`, e.g. once liked
+    """
+    redis = get_redis()
+
+    pipe = redis.pipeline(transaction=False)
+
+    for key in redis.smembers(candidate_keys_key(user_id)):
+        pipe.zrem(key, candidate_id)
+
+    pipe.execute()
+
+
+def get_candidate_page(user_id, gender, min_age, max_age, cursor, limit):
+    """
+    Gets a page of candidates after the cursor as `User` rows (from `values()`) with the cursor of the next page. \n
+    Pages are read from the candidate set, which is (re)built in background once missing or older than
+    `DISCOVERY_REFRESH_AFTER` seconds, and from the database by keyset until it is available.
+    """
+    from accounts.tasks import build_discovery_candidates
+
+    redis = get_redis()
+
+    key = candidates_key(user_id, gender, min_age, max_age)
+
+    built = redis.get(key + '_built')
+
+    if (built is None or time.time() - float(built) >
+            settings.DISCOVERY_REFRESH_AFTER) and redis.set(
+                key + '_building', 1, nx=True,
+                ex=settings.DISCOVERY_BUILD_TIMEOUT):
+        try:
+            build_discovery_candidates.delay(user_id, gender, min_age,
+                                             max_age)
+        except Exception:
+            # pages keep being read from the current set or the database until a build can be queued
+            logger.exception('Could not queue the build of %s', key)
+            redis.delete(key + '_building')
+
+    after = decode_cursor(cursor) if cursor else None
+
+    if built is not None:
+        start = 0
+
+        if after is not None:
+            rank = redis.zrevrank(key, after[1])
+
+            # the cursor's candidate left the set, continue from its score
+            start = rank + 1 if rank is not None else redis.zcount(
+                key, '(' + str(after[0].timestamp()), '+inf')
+
+        entries = redis.zrevrange(key,
+                                  start,
+                                  start + limit - 1,
+                                  withscores=True)
+
+        ids = [int(id) for id, _ in entries]
+
+        users = {
+            row['id']: row
+            for row in User.objects.filter(id__in=ids, is_active=True).values(
+                'id', *USER_VALUES)
+        }
+
+        # candidates deactivated since the set was built are skipped
+        rows = [users[id] for id in ids if id in users]
+
+        next_cursor = encode_cursor(
+            datetime.fromtimestamp(entries[-1][1], tz=timezone.utc),
+            ids[-1]) if len(entries) == limit else None
+
+        return rows, next_cursor
+
+    queryset = get_candidates(user_id, gender, min_age, max_age)
+
+    if after is not None:
+        queryset = queryset.filter(Q(last_active__lt=after[0])
+                                   | Q(last_active=after[0], id__lt=after[1]),
+                                   last_active__lte=after[0])
+
+    rows = list(queryset.values('id', *USER_VALUES)[:limit])
+
+    next_cursor = encode_cursor(rows[-1]['last_active'],
+                                rows[-1]['id']) if len(rows) == limit else None
+
+    return rows, next_cursor
+
+
+class DiscoveryPagination(pagination.BasePagination):
+    """
+    Cursor Paginator for discovering `User`s, most recently active first. \n
+    Requires client to provide `cursor` and `limit` parameters, an empty `cursor` gets the first page.
+    """
+
+    default_limit = 100
+    max_limit = 1000
+    min_limit = 1
+
+    def paginate_queryset(self, user, request, view=None):
+
+        limit = request.query_params.get('limit')
+        cursor = request.query_params.get('cursor', '').strip()
+
+        self.limit = self.default_limit
+
+        if limit and limit.strip().isnumeric():
+
+            self.limit = int(limit.strip())
+
+            if self.limit > self.max_limit:
+                raise serializers.ValidationError({
+                    "limit": [
+                        "Limit should be less than or equal to {0}".format(
+                            self.max_limit)
+                    ]
+                })
+
+            elif self.limit < self.min_limit:
+                raise serializers.ValidationError({
+                    "limit": [
+                        "Limit should be greater than or equal to {0}".format(
+                            self.min_limit)
+                    ]
+                })
+
+        rows, self.next_cursor = get_candidate_page(user.id,
+                                                    *get_preferences(request),
+                                                    cursor, self.limit)
+
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({'results': data, 'cursor': self.next_cursor})
@@ -0,0 +1,167 @@
+import math
+
+from django.db.models import F, Q, Value
+from django.db.models.functions import ASin, Cos, Least, Power, Radians, Sin, Sqrt
+
+# mean radius of the Earth in kilometers
+EARTH_RADIUS = 6371.0088
+
+# kilometers per degree of latitude
+KM_PER_DEGREE = math.pi * EARTH_RADIUS / 180
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+GEOHASH_PRECISION = 12
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    """
+    Encodes a location into a geohash of `precision` characters
+    """
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+
+    geohash = []
+    bits = 0
+    bit_count = 0
+    even = True
+
+    while len(geohash) < precision:
+        value, bounds = (longitude, lng_range) if even else (latitude,
+                                                             lat_range)
+        middle = (bounds[0] + bounds[1]) / 2
+
+        bits <<= 1
+
+        if value >= middle:
+            bits |= 1
+            bounds[0] = middle
+        else:
+            bounds[1] = middle
+
+        even = not even
+        bit_count += 1
+
+        if bit_count == 5:
+            geohash.append(GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+
+    return ''.join(geohash)
+
+
+def snap_location(latitude, longitude, step):
+    """
+    Rounds a location to the nearest point of a grid of `step` degrees, so that stored locations do not reveal
+    precise positions
+    """
+    latitude = min(90.0, max(-90.0, round(latitude / step) * step))
+    longitude = (round(longitude / step) * step + 180.0) % 360.0 - 180.0
+
+    # keep the grid points free of floating point noise
+    return round(latitude, 6), round(longitude, 6)
+
+
+def cell_size(precision):
+    """
+    Gets the (latitude, longitude) size in degrees of the geohash cells of `precision` characters
+    """
+    lng_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+
+    return 180.0 / 2**lat_bits, 360.0 / 2**lng_bits
+
+
+def bounding_box(latitude, longitude, radius):
+    """
+    Gets the (latitude, longitude) half sizes in degrees of the box enclosing the circle of `radius` kilometers
+    """
+    lat_delta = radius / KM_PER_DEGREE
+
+    cos_lat = math.cos(math.radians(latitude))
+
+    # sine of the largest longitude difference of the points of the circle
+    sin_lng = math.sin(radius / EARTH_RADIUS) / cos_lat if cos_lat > 1e-6 else 2
+
+    lng_delta = 180.0 if sin_lng >= 1 else math.degrees(math.asin(sin_lng))
+
+    return lat_delta, lng_delta
+
+
+def covering_geohashes(latitude, longitude, radius):
+    """
+    Gets the geohash prefixes of the cells covering the circle of `radius` kilometers, i.e. the cell of the center
+    and its neighbours at the longest precision whose cells are larger than the circle. \n
+    Returns None if the circle is larger than the cells of any precision.
+    """
+    lat_delta, lng_delta = bounding_box(latitude, longitude, radius)
+
+    precision = 0
+
+    while precision < GEOHASH_PRECISION:
+        cell_lat, cell_lng = cell_size(precision + 1)
+
+        if cell_lat < lat_delta or cell_lng < lng_delta:
+            break
+
+        precision += 1
+
+    if precision == 0:
+        return None
+
+    cell_lat, cell_lng = cell_size(precision)
+
+    prefixes = set()
+
+    for lat_step in (-1, 0, 1):
+        for lng_step in (-1, 0, 1):
+            lat = min(90.0, max(-90.0, latitude + lat_step * cell_lat))
+            lng = (longitude + lng_step * cell_lng + 180.0) % 360.0 - 180.0
+
+            prefixes.add(encode_geohash(lat, lng, precision))
+
+    return sorted(prefixes)
+
+
+def filter_nearby(queryset, latitude, longitude, radius):
+    """
+    Filters `User`s located within `radius` kilometers of a location, ordered by `distance` (in kilometers). \n
+    Candidates are narrowed down by geohash prefix and bounding box so that only the indexed cells are read.
+    """
+    queryset = queryset.filter(geohash__isnull=False)
+
+    prefixes = covering_geohashes(latitude, longitude, radius)
+
+    if prefixes is not None:
+        condition = Q()
+
+        for prefix in prefixes:
+            condition |= Q(geohash__startswith=prefix)
+
+        queryset = queryset.filter(condition)
+
+    lat_delta, lng_delta = bounding_box(latitude, longitude, radius)
+
+    queryset = queryset.filter(latitude__gte=latitude - lat_delta,
+                               latitude__lte=latitude + lat_delta)
+
+    # the box cannot be expressed as one longitude range across the antimeridian
+    if -180.0 <= longitude - lng_delta and longitude + lng_delta <= 180.0:
+        queryset = queryset.filter(longitude__gte=longitude - lng_delta,
+                                   longitude__lte=longitude + lng_delta)
+
+    lat = math.radians(latitude)
+    lng = math.radians(longitude)
+
+    # haversine formula
+    haversine = Power(Sin((Radians(F('latitude')) - Value(lat)) / 2),
+                      2) + Value(math.cos(lat)) * Cos(
+                          Radians(F('latitude'))) * Power(
+                              Sin((Radians(F('longitude')) - Value(lng)) / 2),
+                              2)
+
+    # rounding can push the square root slightly above 1
+    distance = 2 * EARTH_RADIUS * ASin(Least(Value(1.0), Sqrt(haversine)))
+
+    return queryset.annotate(distance=distance).filter(
+        distance__lte=radius).order_by('distance', 'id')
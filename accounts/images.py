@@ -0,0 +1,129 @@
+import os
+import struct
+
+from PIL import Image, ImageOps
+
+# sizes (in pixels) of the variants generated for photos, keeping their aspect ratio
+VARIANTS = {
+    'thumbnail': (150, 150),
+    'medium': (600, 600),
+}
+
+
+def variant_path(path, variant):
+    """
+    Gets the path of the file of a variant of the image at `path`
+    """
+    return path + '_' + variant
+
+
+def make_variants(path):
+    """
+    Generates the JPEG variants of the image at `path` and returns their paths by variant
+    """
+    paths = {}
+
+    with Image.open(path) as image:
+        image = ImageOps.exif_transpose(image)
+
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        for variant, size in VARIANTS.items():
+            resized = image.copy()
+            resized.thumbnail(size, Image.LANCZOS)
+            resized.save(variant_path(path, variant),
+                         'JPEG',
+                         quality=85,
+                         optimize=True)
+
+            paths[variant] = variant_path(path, variant)
+
+    return paths
+
+
+def remove_variants(path):
+    """
+    Removes the files of the variants of the image at `path`
+    """
+    for variant in VARIANTS:
+        try:
+            os.remove(variant_path(path, variant))
+        except FileNotFoundError:
+            pass
+
+
+# start of frame markers of JPEG holding the dimensions of the image
+JPEG_SOF_MARKERS = {
+    0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE,
+    0xCF
+}
+
+
+def sniff_jpeg(head):
+    index = 2
+
+    while index + 9 <= len(head):
+        if head[index] != 0xFF:
+            return None
+
+        marker = head[index + 1]
+
+        # fill bytes and markers without a segment
+        if marker == 0xFF:
+            index += 1
+            continue
+
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            index += 2
+            continue
+
+        if marker in JPEG_SOF_MARKERS:
+            height, width = struct.unpack('>HH', head[index + 5:index + 9])
+            return 'jpeg', width, height
+
+        length, = struct.unpack('>H', head[index + 2:index + 4])
+        index += 2 + length
+
+    return None
+
+
+def sniff_webp(head):
+    chunk = head[12:16]
+
+    if chunk == b'VP8 ' and len(head) >= 30:
+        width, height = struct.unpack('<HH', head[26:30])
+        return 'webp', width & 0x3FFF, height & 0x3FFF
+
+    if chunk == b'VP8L' and len(head) >= 25:
+        b0, b1, b2, b3 = head[21:25]
+        return 'webp', 1 + (((b1 & 0x3F) << 8) | b0), 1 + (
+            ((b3 & 0xF) << 10) | (b2 << 2) | ((b1 & 0xC0) >> 6))
+
+    if chunk == b'VP8X' and len(head) >= 30:
+        return 'webp', 1 + int.from_bytes(head[24:27], 'little'), 1 + \
+            int.from_bytes(head[27:30], 'little')
+
+    return None
+
+
+def sniff_image(head):
+    """
+    Finds the format and dimensions of an image from its leading bytes by their magic numbers. \n
+    Returns (format, width, height), or None if the bytes do not start a supported image.
+    """
+    if head.startswith(b'\x89PNG\r\n\x1a\n') and len(head) >= 24:
+        width, height = struct.unpack('>II', head[16:24])
+        return 'png', width, height
+
+    if head.startswith(b'\xff\xd8'):
+        return sniff_jpeg(head)
+
+    if head[:6] in (b'GIF87a', b'GIF89a') and len(head) >= 10:
+        width, height = struct.unpack('<HH', head[6:10])
+        return 'gif', width, height
+
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return sniff_webp(head)
+
+    return None
@@ -0,0 +1,45 @@
+# Generated by Django 3.2.9 on 2026-10-18 11:00
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_likes(apps, schema_editor):
+    """
+    Keeps only the first of duplicate `Likes` so that the unique constraint can be added
+    """
+    Likes = apps.get_model('accounts', 'Likes')
+
+    # only pairs liked more than once need a delete
+    duplicates = Likes.objects.values('liked_by', 'liked_on').annotate(
+        count=Count('id'), first_id=Min('id')).filter(count__gt=1).values_list(
+            'liked_by', 'liked_on', 'first_id')
+
+    for liked_by, liked_on, first_id in duplicates:
+        Likes.objects.filter(liked_by=liked_by,
+                             liked_on=liked_on).exclude(id=first_id).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_likes,
+                             migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='likes',
+            constraint=models.UniqueConstraint(fields=('liked_by',
+                                                       'liked_on'),
+                                               name='unique_like'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(('is_active', True),
+                                                  ('is_staff', False)),
+                               fields=['gender', 'date_of_birth'],
+                               name='user_browse_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 3.2.9 on 2026-10-18 15:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_user_age_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(('is_active', True),
+                                                  ('is_staff', False)),
+                               fields=['last_active', 'id'],
+                               name='user_discovery_idx'),
+        ),
+    ]
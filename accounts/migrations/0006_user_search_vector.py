@@ -0,0 +1,41 @@
+# Generated by Django 3.2.9 on 2026-10-18 17:00
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+def update_search_vectors(apps, schema_editor):
+    """
+    Fills the search vectors of the existing `User`s
+    """
+    from accounts.search import update_search_vector
+
+    User = apps.get_model('accounts', 'User')
+
+    update_search_vector(User.objects.all())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_user_location'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True),
+        ),
+        migrations.RunPython(update_search_vectors,
+                             migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='user',
+            index=django.contrib.postgres.indexes.GinIndex(
+                condition=models.Q(('is_active', True), ('is_staff', False)),
+                fields=['search_vector'],
+                name='user_search_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 3.2.9 on 2026-10-18 18:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_user_search_vector'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='photo',
+            name='image',
+            field=models.URLField(blank=True, default='', max_length=1000),
+        ),
+        migrations.AddField(
+            model_name='photo',
+            name='status',
+            field=models.CharField(choices=[
+                ('pending', 'Photo status : Pending'),
+                ('uploaded', 'Photo status : Uploaded'),
+                ('failed', 'Photo status : Failed'),
+                ('deleting', 'Photo status : Deleting')
+            ],
+                                   default='uploaded',
+                                   max_length=25),
+        ),
+    ]
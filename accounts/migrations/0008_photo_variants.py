@@ -0,0 +1,33 @@
+# Generated by Django 3.2.9 on 2026-10-18 19:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_photo_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photo',
+            name='thumbnail',
+            field=models.URLField(blank=True, default='', max_length=1000),
+        ),
+        migrations.AddField(
+            model_name='photo',
+            name='medium',
+            field=models.URLField(blank=True, default='', max_length=1000),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='main_photo_thumbnail',
+            field=models.URLField(blank=True, default='', max_length=1000),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='main_photo_medium',
+            field=models.URLField(blank=True, default='', max_length=1000),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.9 on 2026-10-18 20:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_photo_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photo',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='photo',
+            index=models.Index(fields=['user', 'content_hash'],
+                               name='photo_content_hash_idx'),
+        ),
+    ]
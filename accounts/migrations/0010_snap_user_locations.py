@@ -0,0 +1,36 @@
+# Generated by Django 3.2.9 on 2026-10-19 10:00
+
+from django.db import migrations
+
+from DatingAppBackend import settings
+
+from accounts.geo import encode_geohash, snap_location
+
+
+def snap_user_locations(apps, schema_editor):
+    """
+    Snaps the stored locations of `User`s to the `LOCATION_GRID` and updates their geohashes
+    """
+    User = apps.get_model('accounts', 'User')
+
+    users = User.objects.filter(latitude__isnull=False,
+                                longitude__isnull=False).only(
+                                    'id', 'latitude', 'longitude')
+
+    for user in users.iterator():
+        user.latitude, user.longitude = snap_location(user.latitude,
+                                                      user.longitude,
+                                                      settings.LOCATION_GRID)
+        user.geohash = encode_geohash(user.latitude, user.longitude)
+        user.save(update_fields=['latitude', 'longitude', 'geohash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_photo_content_hash'),
+    ]
+
+    operations = [
+        migrations.RunPython(snap_user_locations, migrations.RunPython.noop),
+    ]
@@ -1,20 +1,25 @@
 from datetime import datetime, date
-from django.core.validators import MinLengthValidator
+from django.core.validators import MaxValueValidator, MinLengthValidator, MinValueValidator
 from django.utils.deconstruct import deconstructible
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.db import models
 from django.contrib.auth.models import (BaseUserManager, AbstractBaseUser)
 from django.contrib.postgres.fields import CICharField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 
 from DatingAppBackend import settings
 
+from accounts.geo import encode_geohash, snap_location
 
-def calculate_age(born):
+
+def calculate_age(born, today=None):
     """
-    Calculates age
+    Calculates age on `today` (defaults to the current date)
     """
-    today = date.today()
+    if today is None:
+        today = date.today()
     return today.year - born.year - ((today.month, today.day) <
                                      (born.month, born.day))
 
@@ -146,10 +151,41 @@ class User(AbstractBaseUser):
     # country of the user
     country = models.CharField(max_length=40, null=True, blank=True)
 
+    # latitude of the user's location
+    latitude = models.FloatField(
+        validators=[MinValueValidator(-90), MaxValueValidator(90)],
+        null=True,
+        blank=True)
+
+    # longitude of the user's location
+    longitude = models.FloatField(
+        validators=[MinValueValidator(-180), MaxValueValidator(180)],
+        null=True,
+        blank=True)
+
+    # geohash of the user's location, kept in sync with latitude and longitude on save
+    geohash = models.CharField(max_length=12,
+                               null=True,
+                               blank=True,
+                               editable=False)
+
+    # search vector of the introduction, interests and looking for preference of the user
+    search_vector = SearchVectorField(null=True, editable=False)
+
     # main photo (URL) of the user
     main_photo = models.URLField(default=settings.DEFAULT_PROFILE_URL,
                                  max_length=1000)
 
+    # URL of the thumbnail variant of the main photo, empty if not available
+    main_photo_thumbnail = models.URLField(max_length=1000,
+                                           blank=True,
+                                           default='')
+
+    # URL of the medium variant of the main photo, empty if not available
+    main_photo_medium = models.URLField(max_length=1000,
+                                        blank=True,
+                                        default='')
+
     # field to get user activation status
     is_active = models.BooleanField(default=True)
 
@@ -162,12 +198,56 @@ class User(AbstractBaseUser):
     # instance of `UseManager` will manage objects of `User` type
     objects = UserManager()
 
+    class Meta:
+        indexes = [
+            # browsing active non-staff users by gender and age
+            models.Index(fields=['gender', 'date_of_birth'],
+                         name='user_browse_idx',
+                         condition=models.Q(is_active=True, is_staff=False)),
+            # browsing active non-staff users by age
+            models.Index(fields=['date_of_birth'],
+                         name='user_age_idx',
+                         condition=models.Q(is_active=True, is_staff=False)),
+            # discovering active non-staff users by last activity
+            models.Index(fields=['last_active', 'id'],
+                         name='user_discovery_idx',
+                         condition=models.Q(is_active=True, is_staff=False)),
+            # searching active non-staff users nearby by geohash prefix
+            models.Index(fields=['geohash'],
+                         name='user_geohash_idx',
+                         opclasses=['varchar_pattern_ops'],
+                         condition=models.Q(is_active=True, is_staff=False)),
+            # searching profiles of active non-staff users
+            GinIndex(fields=['search_vector'],
+                     name='user_search_idx',
+                     condition=models.Q(is_active=True, is_staff=False)),
+        ]
+
     def __str__(self):
         """
         Returns a string representation of this `User` by providing username.
         """
         return self.username
 
+    def save(self, *args, **kwargs):
+        """
+        Saves this `User` snapping its location to the `LOCATION_GRID` and updating its geohash
+        """
+        if self.latitude is None or self.longitude is None:
+            self.geohash = None
+        else:
+            self.latitude, self.longitude = snap_location(
+                self.latitude, self.longitude, settings.LOCATION_GRID)
+            self.geohash = encode_geohash(self.latitude, self.longitude)
+
+        update_fields = kwargs.get('update_fields')
+
+        if update_fields is not None and ('latitude' in update_fields or
+                                          'longitude' in update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'geohash'}
+
+        super().save(*args, **kwargs)
+
     def get_age(self):
         """
         Gets the age of `User`
@@ -181,6 +261,20 @@ def user_photos_path(instance, filename):
     return '{0}/photos/{1}'.format(instance.user.id, filename)
 
 
+# upload states of photos
+PENDING = 'pending'
+UPLOADED = 'uploaded'
+FAILED = 'failed'
+DELETING = 'deleting'
+
+PHOTO_STATUS = [
+    (PENDING, 'Photo status : Pending'),
+    (UPLOADED, 'Photo status : Uploaded'),
+    (FAILED, 'Photo status : Failed'),
+    (DELETING, 'Photo status : Deleting'),
+]
+
+
 class Photo(models.Model):
     """
     Class for storing image urls uploaded by user in their profile
@@ -189,12 +283,33 @@ class Photo(models.Model):
     # user field
     user = models.ForeignKey(User, on_delete=models.CASCADE)
 
-    # URL for image uploaded by user
-    image = models.URLField(max_length=1000)
+    # URL for image uploaded by user, empty until uploaded
+    image = models.URLField(max_length=1000, blank=True, default='')
+
+    # URL of the thumbnail variant of the image, empty if not generated
+    thumbnail = models.URLField(max_length=1000, blank=True, default='')
 
-    # public ID of the image associated with Cloudinary
+    # URL of the medium variant of the image, empty if not generated
+    medium = models.URLField(max_length=1000, blank=True, default='')
+
+    # public ID of the image associated with the photo storage
     public_id = models.CharField(max_length=100, unique=True)
 
+    # upload state of the image
+    status = models.CharField(choices=PHOTO_STATUS,
+                              max_length=25,
+                              default=UPLOADED)
+
+    # SHA-256 hash of the content of the image, empty for photos uploaded before it was recorded
+    content_hash = models.CharField(max_length=64, blank=True, default='')
+
+    class Meta:
+        indexes = [
+            # finding duplicate uploads of a user
+            models.Index(fields=['user', 'content_hash'],
+                         name='photo_content_hash_idx'),
+        ]
+
 
 class Likes(models.Model):
     """ 
@@ -210,3 +325,9 @@ class Likes(models.Model):
     liked_on = models.ForeignKey(User,
                                  on_delete=models.CASCADE,
                                  related_name='liked_on')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['liked_by', 'liked_on'],
+                                    name='unique_like'),
+        ]
@@ -1,9 +1,100 @@
 from rest_framework import pagination
 from rest_framework import serializers
+from rest_framework.response import Response
 
-from datetime import datetime
+from datetime import date
 from dateutil.relativedelta import relativedelta
 
+from DatingAppBackend import settings
+
+
+def get_preferences(request):
+    """
+    Gets the `gender`, `min-age` and `max-age` query parameters, missing or invalid ones are None
+    """
+    gender = request.query_params.get('gender')
+    min_age = request.query_params.get('min-age')
+    max_age = request.query_params.get('max-age')
+
+    gender = gender.strip().lower() if gender else None
+    min_age = int(min_age.strip()) if min_age and min_age.strip().isnumeric(
+    ) else None
+    max_age = int(max_age.strip()) if max_age and max_age.strip().isnumeric(
+    ) else None
+
+    return gender, min_age, max_age
+
+
+def get_location(request):
+    """
+    Gets the `near` (as `latitude,longitude`) and `radius` (in kilometers) query parameters. \n
+    Returns None if `near` is not provided.
+    """
+    near = request.query_params.get('near')
+    radius = request.query_params.get('radius')
+
+    if near is None:
+        return None
+
+    try:
+        latitude, longitude = (float(value) for value in near.split(','))
+    except ValueError:
+        raise serializers.ValidationError(
+            {"near": ["Near should be given as latitude,longitude"]})
+
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise serializers.ValidationError(
+            {"near": ["Near should be a valid latitude,longitude"]})
+
+    if radius is None:
+        radius = settings.NEARBY_DEFAULT_RADIUS
+    else:
+        try:
+            radius = float(radius.strip())
+        except ValueError:
+            raise serializers.ValidationError(
+                {"radius": ["Radius should be a number"]})
+
+        if radius > settings.NEARBY_MAX_RADIUS:
+            raise serializers.ValidationError({
+                "radius": [
+                    "Radius should be less than or equal to {0}".format(
+                        settings.NEARBY_MAX_RADIUS)
+                ]
+            })
+
+        elif not radius >= settings.NEARBY_MIN_RADIUS:
+            raise serializers.ValidationError({
+                "radius": [
+                    "Radius should be greater than or equal to {0}".format(
+                        settings.NEARBY_MIN_RADIUS)
+                ]
+            })
+
+    return latitude, longitude, radius
+
+
+def filter_users(queryset, gender=None, min_age=None, max_age=None):
+    """
+    Filters `User`s by gender and age
+    """
+    if gender:
+        queryset = queryset.filter(gender=gender)
+
+    today = date.today()
+
+    # users at least `min_age` years old were born on or before this date
+    if min_age is not None:
+        queryset = queryset.filter(date_of_birth__lte=today -
+                                   relativedelta(years=min_age))
+
+    # users at most `max_age` years old were born after this date
+    if max_age is not None:
+        queryset = queryset.filter(date_of_birth__gt=today -
+                                   relativedelta(years=max_age + 1))
+
+    return queryset
+
 
 class UserPagination(pagination.LimitOffsetPagination):
     """
@@ -21,10 +112,6 @@ class UserPagination(pagination.LimitOffsetPagination):
         limit = request.query_params.get('limit')
         offset = request.query_params.get('offset')
 
-        gender = request.query_params.get('gender')
-        min_age = request.query_params.get('min-age')
-        max_age = request.query_params.get('max-age')
-
         if limit and limit.strip().isnumeric():
 
             limit = int(limit.strip())
@@ -65,27 +152,58 @@ class UserPagination(pagination.LimitOffsetPagination):
                     ]
                 })
 
-        if gender:
+        queryset = filter_users(queryset, *get_preferences(request))
+
+        return super(self.__class__,
+                     self).paginate_queryset(queryset, request, view)
+
+
+class MatchPagination(pagination.BasePagination):
+    """
+    Cursor Paginator for matches of a `User`, ordered by username. \n Requires client to provide `cursor` and `limit` parameters.
+    """
 
-            gender = gender.strip().lower()
+    default_limit = 100
+    max_limit = 1000
+    min_limit = 1
 
-            queryset = queryset.filter(gender=gender)
+    def paginate_queryset(self, queryset, request, view=None):
 
-        if min_age and min_age.strip().isnumeric():
+        limit = request.query_params.get('limit')
+        cursor = request.query_params.get('cursor')
 
-            min_age = int(min_age.strip())
+        self.limit = self.default_limit
 
-            date = datetime.now() - relativedelta(years=min_age)
+        if limit and limit.strip().isnumeric():
 
-            queryset = queryset.filter(date_of_birth__year__lte=date.year)
+            self.limit = int(limit.strip())
 
-        if max_age and max_age.strip().isnumeric():
+            if self.limit > self.max_limit:
+                raise serializers.ValidationError({
+                    "limit": [
+                        "Limit should be less than or equal to {0}".format(
+                            self.max_limit)
+                    ]
+                })
 
-            max_age = int(max_age.strip())
+            elif self.limit < self.min_limit:
+                raise serializers.ValidationError({
+                    "limit": [
+                        "Limit should be greater than or equal to {0}".format(
+                            self.min_limit)
+                    ]
+                })
 
-            date = datetime.now() - relativedelta(years=max_age)
+        # the cursor is the username of the last match of the previous page
+        if cursor:
+            queryset = queryset.filter(username__gt=cursor)
 
-            queryset = queryset.filter(date_of_birth__year__gte=date.year)
+        rows = list(queryset.order_by('username')[:self.limit])
 
-        return super(self.__class__,
-                     self).paginate_queryset(queryset, request, view)
+        self.next_cursor = rows[-1]['username'] if len(
+            rows) == self.limit else None
+
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({'results': data, 'cursor': self.next_cursor})
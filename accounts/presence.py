@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import time
+
+from redis import RedisError
+
+from DatingAppBackend import fast_json, settings
+
+logger = logging.getLogger(__name__)
+
+# hash of the device sets that have devices by key, holding the event sent once their devices expire
+PRESENCE_KEYS = 'presence_keys'
+
+# Lua script adding (delta > 0), removing (delta < 0) or only counting (delta = 0) the device ARGV[1] in the
+# device sets KEYS[2..], after pruning the devices whose last heartbeat is older than ARGV[3] seconds at ARGV[2].
+# The deltas and the events sent once the devices of the sets expire follow in ARGV[4..], the sets having devices
+# are tracked in the hash KEYS[1] until their last device is removed.
+UPDATE_DEVICES = """
+local now = tonumber(ARGV[2])
+local ttl = tonumber(ARGV[3])
+local counts = {}
+for i = 2, #KEYS do
+    local key = KEYS[i]
+    local delta = tonumber(ARGV[2 + (i - 1) * 2])
+    local on_expire = ARGV[3 + (i - 1) * 2]
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now - ttl)
+    if delta > 0 then
+        redis.call('ZADD', key, now, ARGV[1])
+        if on_expire ~= '' then
+            redis.call('HSET', KEYS[1], key, on_expire)
+        end
+    elseif delta < 0 then
+        redis.call('ZREM', key, ARGV[1])
+    end
+    local count = redis.call('ZCARD', key)
+    if count > 0 then
+        redis.call('EXPIRE', key, math.ceil(ttl * 2))
+    elseif delta < 0 then
+        redis.call('HDEL', KEYS[1], key)
+    end
+    counts[i - 1] = count
+end
+return counts
+"""
+
+# Lua script pruning the devices whose last heartbeat is older than ARGV[1] from the device sets KEYS[2..] and
+# returning the sets left without devices, each of them is returned once as it is removed from the hash KEYS[1]
+SWEEP_DEVICES = """
+local expired = {}
+for i = 2, #KEYS do
+    local key = KEYS[i]
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', ARGV[1])
+    if redis.call('ZCARD', key) == 0 and redis.call('HDEL', KEYS[1], key) == 1 then
+        expired[#expired + 1] = key
+    end
+end
+return expired
+"""
+
+
+class Presence:
+    """
+    Sets of the connected devices of online `User`s stored in Redis as sorted sets of channel names scored by
+    their last heartbeat. \n
+    Devices are pruned once their heartbeat is `ttl` seconds old, so devices of crashed workers are not counted
+    even while other devices of the `User` are connected. Sets left without devices that way are swept by
+    `sweep_presence`, which sends their offline events.
+    """
+    def __init__(self, redis, ttl=None):
+        self.redis = redis
+        self.ttl = settings.PRESENCE_TTL if ttl is None else ttl
+        self.update_devices = redis.register_script(UPDATE_DEVICES)
+
+    async def update(self, device, changes):
+        """
+        Applies a list of (key, delta) or (key, delta, event sent once the devices expire) changes for the device
+        to the device sets in one round trip and returns their new counts
+        """
+        args = [device, time.time(), self.ttl]
+
+        for change in changes:
+            on_expire = change[2] if len(change) > 2 else None
+
+            args += [
+                change[1], '' if on_expire is None else
+                fast_json.dumps(on_expire)
+            ]
+
+        counts = await self.update_devices(
+            keys=[PRESENCE_KEYS] + [change[0] for change in changes],
+            args=args)
+
+        return [int(count) for count in counts]
+
+    async def add(self, key, device, on_expire=None):
+        """
+        Adds a device to the set and returns the new count
+        """
+        return (await self.update(device, [(key, 1, on_expire)]))[0]
+
+    async def remove(self, key, device):
+        """
+        Removes a device from the set and returns the new count
+        """
+        return (await self.update(device, [(key, -1)]))[0]
+
+    async def count(self, key):
+        """
+        Gets the number of live devices of the set
+        """
+        return (await self.update('', [(key, 0)]))[0]
+
+    async def keep_alive(self, device, changes):
+        """
+        Keeps renewing the heartbeat of the device in the sets of the (key, delta, event) changes it was added with
+        until cancelled, a failed renewal is retried at the next heartbeat
+        """
+        while True:
+            await asyncio.sleep(self.ttl / 2)
+
+            try:
+                await self.update(device, changes)
+            except RedisError as error:
+                logger.warning('Could not renew the heartbeat of %s: %s',
+                               device, error)
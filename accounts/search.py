@@ -0,0 +1,36 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db.models import F
+
+# text search configuration of the profile search
+SEARCH_CONFIG = 'english'
+
+
+def profile_search_vector():
+    """
+    Gets the expression of the search vector of a `User`'s profile, weighting interests over what they are
+    looking for over their introduction
+    """
+    return SearchVector('interests', weight='A',
+                        config=SEARCH_CONFIG) + SearchVector(
+                            'looking_for', weight='B',
+                            config=SEARCH_CONFIG) + SearchVector(
+                                'introduction',
+                                weight='C',
+                                config=SEARCH_CONFIG)
+
+
+def update_search_vector(queryset):
+    """
+    Updates the search vector of the `User`s from their current profile
+    """
+    queryset.update(search_vector=profile_search_vector())
+
+
+def search_profiles(queryset, text):
+    """
+    Filters `User`s whose profile matches the web search syntax query, best matches first
+    """
+    query = SearchQuery(text, search_type='websearch', config=SEARCH_CONFIG)
+
+    return queryset.filter(search_vector=query).annotate(
+        rank=SearchRank(F('search_vector'), query)).order_by('-rank', 'id')
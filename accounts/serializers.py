@@ -1,8 +1,13 @@
+from datetime import date
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
 from rest_framework import serializers
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
 from rest_framework_simplejwt.exceptions import InvalidToken
 
-from accounts.models import Photo, User
+from DatingAppBackend import settings
+
+from accounts.models import UPLOADED, Photo, User, calculate_age
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -16,7 +21,7 @@ class UserSerializer(serializers.ModelSerializer):
     lookingFor = serializers.CharField(source='looking_for')
     dateOfBirth = serializers.DateField(source='date_of_birth')
     lastActive = serializers.DateTimeField(source='last_active')
-    mainPhoto = serializers.URLField(source='main_photo')
+    mainPhoto = serializers.SerializerMethodField()
 
     class Meta:
         model = User
@@ -24,6 +29,84 @@ class UserSerializer(serializers.ModelSerializer):
                   'country', 'age', 'firstName', 'lastName', 'dateOfBirth',
                   'lastActive', 'mainPhoto', 'lookingFor')
 
+    def get_mainPhoto(self, obj):
+        size = self.context.get('size')
+
+        return getattr(obj, 'main_photo_' + size) or obj.main_photo if size \
+            else obj.main_photo
+
+
+# fields of `User` read by `serialize_user_values`
+USER_VALUES = ('username', 'introduction', 'gender', 'interests', 'city',
+               'country', 'first_name', 'last_name', 'date_of_birth',
+               'last_active', 'main_photo', 'main_photo_thumbnail',
+               'main_photo_medium', 'looking_for')
+
+# sizes of photos clients can ask for besides the original one
+PHOTO_SIZES = ('thumbnail', 'medium')
+
+
+def get_photo_size(request):
+    """
+    Gets the `size` query parameter, None for original photos
+    """
+    size = request.query_params.get('size')
+
+    if size is None or size.strip().lower() == 'original':
+        return None
+
+    size = size.strip().lower()
+
+    if size not in PHOTO_SIZES:
+        raise serializers.ValidationError({
+            "size": [
+                "Size should be one of original, {0}".format(
+                    ', '.join(PHOTO_SIZES))
+            ]
+        })
+
+    return size
+
+
+def serialize_datetime(value):
+    """
+    Formats a datetime the way `serializers.DateTimeField` does
+    """
+    if not value:
+        return None
+
+    value = value.astimezone(timezone.get_current_timezone()).isoformat()
+
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+
+    return value
+
+
+def serialize_user_values(rows, size=None):
+    """
+    Fast read-only equivalent of `UserSerializer(many=True).data` for rows of `User.objects.values(*USER_VALUES)`
+    """
+    today = date.today()
+
+    main_photo = 'main_photo_' + size if size else 'main_photo'
+
+    return [{
+        'username': row['username'],
+        'introduction': row['introduction'],
+        'gender': row['gender'],
+        'interests': row['interests'],
+        'city': row['city'],
+        'country': row['country'],
+        'age': calculate_age(row['date_of_birth'], today),
+        'firstName': row['first_name'],
+        'lastName': row['last_name'],
+        'dateOfBirth': row['date_of_birth'].isoformat(),
+        'lastActive': serialize_datetime(row['last_active']),
+        'mainPhoto': row[main_photo] or row['main_photo'],
+        'lookingFor': row['looking_for']
+    } for row in rows]
+
 
 class PhotoSerializer(serializers.ModelSerializer):
     """
@@ -31,11 +114,44 @@ class PhotoSerializer(serializers.ModelSerializer):
     """
 
     id = serializers.CharField(source='public_id')
+    image = serializers.SerializerMethodField()
 
     class Meta:
         model = Photo
         fields = ('image', 'id')
 
+    def get_image(self, obj):
+        size = self.context.get('size')
+
+        return getattr(obj, size) or obj.image if size else obj.image
+
+
+def get_photos_by_user(user_ids, size=None):
+    """
+    Gets the first `PROFILE_PHOTOS_LIMIT` uploaded `Photo`s of each `User` serialized like `PhotoSerializer`
+    by user id in one query
+    """
+    limit = settings.PROFILE_PHOTOS_LIMIT
+
+    # ids of the first photos of the user of each row
+    first_photos = Photo.objects.filter(
+        user=OuterRef('user'), status=UPLOADED).order_by('id').values('id')
+
+    photos = Photo.objects.filter(
+        user__in=user_ids, id__in=Subquery(first_photos[:limit])).order_by(
+            'user', 'id').values('user', 'public_id', 'image', 'thumbnail',
+                                 'medium')
+
+    result = {user_id: [] for user_id in user_ids}
+
+    for photo in photos:
+        result[photo['user']].append({
+            'image': photo[size] or photo['image'] if size else photo['image'],
+            'id': photo['public_id']
+        })
+
+    return result
+
 
 class TokenObtainPairSerializer(TokenObtainPairSerializer):
     """
@@ -0,0 +1,225 @@
+import hashlib
+import os
+import shutil
+import uuid
+
+import cloudinary.uploader
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile, StopFutureHandlers
+from django.utils.module_loading import import_string
+
+from DatingAppBackend import settings
+
+from accounts.images import sniff_image
+
+
+class PhotoStorage:
+    """
+    Base class of the storages `Photo`s are uploaded to
+    """
+    def upload(self, path, public_id):
+        """
+        Uploads the file at `path` under `public_id` and returns its URL
+        """
+        raise NotImplementedError
+
+    def destroy(self, public_id):
+        """
+        Removes the file uploaded under `public_id`, returns False if it could not be removed
+        """
+        raise NotImplementedError
+
+
+class CloudinaryStorage(PhotoStorage):
+    """
+    Storage uploading `Photo`s to Cloudinary
+    """
+    def upload(self, path, public_id):
+        response = cloudinary.uploader.upload(path, public_id=public_id)
+        return response['secure_url']
+
+    def destroy(self, public_id):
+        response = cloudinary.uploader.destroy(public_id=public_id)
+        return response['result'] in ('ok', 'not found')
+
+
+class LocalStorage(PhotoStorage):
+    """
+    Storage keeping `Photo`s in `PHOTO_LOCAL_ROOT`, served from `PHOTO_LOCAL_URL`
+    """
+    def upload(self, path, public_id):
+        destination = os.path.join(settings.PHOTO_LOCAL_ROOT, public_id)
+
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        shutil.copyfile(path, destination)
+
+        return settings.PHOTO_LOCAL_URL + public_id
+
+    def destroy(self, public_id):
+        try:
+            os.remove(os.path.join(settings.PHOTO_LOCAL_ROOT, public_id))
+        except FileNotFoundError:
+            pass
+
+        return True
+
+
+def get_photo_storage():
+    """
+    Gets an instance of the storage set in `PHOTO_STORAGE`
+    """
+    return import_string(settings.PHOTO_STORAGE)()
+
+
+def upload_path(name):
+    """
+    Gets the path of the temporary file of an upload, named by the id of its `Photo` once created
+    """
+    return os.path.join(settings.PHOTO_UPLOAD_DIR, str(name))
+
+
+TOO_LARGE = 'Image size should be at most {0} bytes'
+
+
+def validate_image(head):
+    """
+    Checks the format and dimensions of an uploaded image from its leading bytes
+    """
+    image = sniff_image(head)
+
+    if image is None:
+        raise ValidationError('Please upload a valid image file')
+
+    _, width, height = image
+
+    if width == 0 or height == 0 or max(width,
+                                        height) > settings.PHOTO_MAX_DIMENSION:
+        raise ValidationError(
+            'Image dimensions should be at most {0} pixels'.format(
+                settings.PHOTO_MAX_DIMENSION))
+
+
+class ValidatedImage(UploadedFile):
+    """
+    Image of a request streamed to a temporary file by `ImageUploadHandler`
+    """
+    def __init__(self, upload_name, content_hash, name, content_type, size,
+                 charset, content_type_extra):
+        super().__init__(open(upload_path(upload_name), 'rb'), name,
+                         content_type, size, charset, content_type_extra)
+        self.upload_name = upload_name
+        self.content_hash = content_hash
+
+
+class ImageUploadHandler(FileUploadHandler):
+    """
+    Upload handler streaming the `image` field of a request to a temporary file as it is received. \n
+    The format and dimensions are sniffed from the leading chunks, buffered until they are found or
+    `PHOTO_SNIFF_SIZE` bytes were read, and `PHOTO_MAX_SIZE` is checked on every chunk. Invalid images are skipped
+    with `error` set before the rest of them is read. The SHA-256 hash of the content is computed in the same pass.
+    """
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.upload_name = uuid.uuid4().hex
+        self.error = None
+        self.active = False
+        self.done = False
+
+    def skip(self, error):
+        self.error = error
+        self.active = False
+        self.file.close()
+        remove_upload(self.upload_name)
+
+        raise SkipFile()
+
+    def validate(self):
+        try:
+            validate_image(self.head)
+        except ValidationError as error:
+            self.skip(error.message)
+
+        self.validated = True
+        self.head = None
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+
+        # only the first image is handled, other fields are left to the next handlers
+        self.active = field_name == 'image' and not self.done
+
+        if not self.active:
+            return
+
+        os.makedirs(settings.PHOTO_UPLOAD_DIR, exist_ok=True)
+
+        self.file = open(upload_path(self.upload_name), 'wb')
+        self.content_hash = hashlib.sha256()
+        self.head = b''
+        self.validated = False
+
+        if self.content_length is not None and \
+            self.content_length > settings.PHOTO_MAX_SIZE:
+            self.skip(TOO_LARGE.format(settings.PHOTO_MAX_SIZE))
+
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.active:
+            return raw_data
+
+        if start + len(raw_data) > settings.PHOTO_MAX_SIZE:
+            self.skip(TOO_LARGE.format(settings.PHOTO_MAX_SIZE))
+
+        if not self.validated:
+            self.head += raw_data
+
+            # metadata can push the dimensions of JPEGs past the first chunks
+            if len(self.head) >= settings.PHOTO_SNIFF_SIZE or sniff_image(
+                    self.head) is not None:
+                self.validate()
+
+        self.content_hash.update(raw_data)
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        if not self.active:
+            return None
+
+        self.active = False
+        self.done = True
+        self.file.close()
+
+        # images smaller than `PHOTO_SNIFF_SIZE` may end before being sniffed
+        if not self.validated:
+            try:
+                validate_image(self.head)
+            except ValidationError as error:
+                self.error = error.message
+
+        return ValidatedImage(self.upload_name, self.content_hash.hexdigest(),
+                              self.file_name, self.content_type, file_size,
+                              self.charset, self.content_type_extra)
+
+    def upload_interrupted(self):
+        if self.active:
+            self.file.close()
+            remove_upload(self.upload_name)
+
+
+def rename_upload(name, photo_id):
+    """
+    Names the temporary file of an upload by the id of its `Photo`
+    """
+    os.replace(upload_path(name), upload_path(photo_id))
+
+
+def remove_upload(name):
+    """
+    Removes the temporary file of an upload
+    """
+    try:
+        os.remove(upload_path(name))
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,180 @@
+import logging
+import time
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.utils import timezone
+
+from DatingAppBackend.celery import app
+from DatingAppBackend import fast_json, settings
+from DatingAppBackend.redis_pool import get_redis
+
+from accounts.discovery import build_candidates, candidates_key
+from accounts.images import VARIANTS, make_variants, remove_variants
+from accounts.models import DELETING, FAILED, PENDING, UPLOADED, Photo, User
+from accounts.presence import PRESENCE_KEYS, SWEEP_DEVICES
+from accounts.storage import get_photo_storage, remove_upload, upload_path
+
+logger = logging.getLogger(__name__)
+
+redis = get_redis()
+
+sweep_devices_script = redis.register_script(SWEEP_DEVICES)
+
+
+# Build the discovery candidate set of a User by running the celery task, letting the next read queue another
+# build once it is done or failed
+@app.task
+def build_discovery_candidates(user_id, gender, min_age, max_age):
+    try:
+        build_candidates(user_id, gender, min_age, max_age)
+    finally:
+        redis.delete(
+            candidates_key(user_id, gender, min_age, max_age) + '_building')
+
+
+def destroy_photo(storage, public_id):
+    """
+    Removes the image of a `Photo` and its variants from the photo storage, returns False if any could not be removed
+    """
+    removed = storage.destroy(public_id)
+
+    for variant in VARIANTS:
+        removed = storage.destroy(public_id + '_' + variant) and removed
+
+    return removed
+
+
+# Upload the temporary file of a pending Photo and its variants to the photo storage by running the celery task,
+# retrying on failure
+@app.task(bind=True,
+          max_retries=settings.PHOTO_UPLOAD_MAX_RETRIES,
+          default_retry_delay=settings.PHOTO_UPLOAD_RETRY_DELAY)
+def upload_photo(self, photo_id):
+
+    photo = Photo.objects.filter(id=photo_id, status=PENDING).first()
+
+    path = upload_path(photo_id)
+
+    if photo is None:
+        remove_variants(path)
+        remove_upload(photo_id)
+        return
+
+    storage = get_photo_storage()
+
+    try:
+        variant_paths = make_variants(path)
+    except FileNotFoundError:
+        Photo.objects.filter(id=photo_id, status=PENDING).update(status=FAILED)
+        return
+    except Exception:
+        # images Pillow cannot decode are kept in their original size only
+        logger.exception('Could not make the variants of photo %s',
+                         photo_id)
+        variant_paths = {}
+
+    try:
+        uploads = {'image': storage.upload(path, photo.public_id)}
+
+        for variant, variant_path in variant_paths.items():
+            uploads[variant] = storage.upload(
+                variant_path, photo.public_id + '_' + variant)
+    except Exception as error:
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=error)
+
+        Photo.objects.filter(id=photo_id, status=PENDING).update(status=FAILED)
+        remove_variants(path)
+        remove_upload(photo_id)
+        return
+
+    remove_variants(path)
+    remove_upload(photo_id)
+
+    updated = Photo.objects.filter(id=photo_id,
+                                   status=PENDING).update(status=UPLOADED,
+                                                          **uploads)
+
+    # the photo was deleted while being uploaded
+    if updated == 0:
+        destroy_photo(storage, photo.public_id)
+
+
+# Remove a Photo and its variants from the photo storage and the db by running the celery task, retrying on failure
+@app.task(bind=True,
+          max_retries=settings.PHOTO_UPLOAD_MAX_RETRIES,
+          default_retry_delay=settings.PHOTO_UPLOAD_RETRY_DELAY)
+def remove_photo(self, photo_id):
+
+    photo = Photo.objects.filter(id=photo_id, status=DELETING).first()
+
+    if photo is None:
+        return
+
+    remove_variants(upload_path(photo_id))
+    remove_upload(photo_id)
+
+    try:
+        if not destroy_photo(get_photo_storage(), photo.public_id):
+            raise Exception('Could not remove ' + photo.public_id)
+    except Exception as error:
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=error)
+
+        raise
+
+    photo.delete()
+
+
+def send_expired_presence(on_expire):
+    """
+    Sends the event of a device set left without devices by expired heartbeats, updating the last active time of
+    the `User` first if it is given
+    """
+    event = on_expire['event']
+
+    if on_expire.get('last_active') is not None:
+        last_active = timezone.now()
+
+        user = User.objects.filter(username=on_expire['last_active']).first()
+
+        if user is not None and user.is_active:
+            user.last_active = last_active
+            user.save()
+
+        event['last_active'] = last_active.isoformat()
+
+    async_to_sync(get_channel_layer().group_send)(on_expire['group'], event)
+
+
+def sweep_devices(keys):
+    """
+    Prunes the expired devices of the device sets mapped to their offline events and sends the events of the sets
+    left without devices
+    """
+    expired_keys = sweep_devices_script(keys=[PRESENCE_KEYS] + list(keys),
+                                        args=[time.time() -
+                                              settings.PRESENCE_TTL])
+
+    for key in expired_keys:
+        send_expired_presence(fast_json.loads(keys[key]))
+
+
+# Prune the devices whose heartbeat expired (e.g. of crashed workers) and send the offline events of the device sets
+# left without devices by running the celery task
+@app.task
+def sweep_presence():
+
+    keys = {}
+
+    for key, on_expire in redis.hscan_iter(PRESENCE_KEYS,
+                                           count=settings.SYNC_CHUNK_SIZE):
+        keys[key] = on_expire
+
+        if len(keys) == settings.SYNC_CHUNK_SIZE:
+            sweep_devices(keys)
+            keys = {}
+
+    if len(keys) > 0:
+        sweep_devices(keys)
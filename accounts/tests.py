@@ -0,0 +1,248 @@
+import math
+from datetime import date
+from io import BytesIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.http.multipartparser import MultiPartParser
+from django.test import SimpleTestCase, TestCase
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from PIL import Image
+from rest_framework import serializers
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from accounts.geo import EARTH_RADIUS, covering_geohashes, encode_geohash, filter_nearby
+from accounts.images import sniff_image
+from accounts.models import Likes, User
+from accounts.pagination import filter_users, get_location
+from accounts.storage import ImageUploadHandler, ValidatedImage, remove_upload
+
+from chat.models import ChatMessage, ChatRoom, TEXT
+
+
+class QueryPlanTests(TestCase):
+    """
+    Checks that the hot queries of the API can be served by their indexes
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = User.objects.bulk_create([
+            User(username='user{0}'.format(i),
+                 password='!',
+                 first_name='first',
+                 last_name='last',
+                 gender='female' if i % 2 else 'male',
+                 date_of_birth=date(1960 + i % 40, 1 + i % 12, 1 + i % 28),
+                 is_staff=i % 50 == 0) for i in range(2000)
+        ])
+
+        Likes.objects.bulk_create([
+            Likes(liked_by=cls.users[i], liked_on=cls.users[i + 1])
+            for i in range(len(cls.users) - 1)
+        ])
+
+        cls.chat_room = ChatRoom.objects.create(
+            chat_room_name='user1_user2_chat',
+            user1=cls.users[1],
+            user2=cls.users[2])
+
+        ChatMessage.objects.bulk_create([
+            ChatMessage(message_type=TEXT,
+                        sender=cls.users[1 + i % 2],
+                        recipient=cls.users[2 - i % 2],
+                        content='message',
+                        seen=i % 10 != 0,
+                        chat_room=cls.chat_room) for i in range(2000)
+        ])
+
+    def explain(self, queryset):
+        # the tables are too small for the planner to prefer an index on its own
+        with connection.cursor() as cursor:
+            cursor.execute('SET enable_seqscan = off')
+
+        try:
+            return queryset.explain()
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = on')
+
+    def test_has_liked_uses_unique_like(self):
+        plan = self.explain(
+            Likes.objects.filter(liked_by=self.users[1],
+                                 liked_on=self.users[2]))
+
+        self.assertIn('unique_like', plan)
+
+    def test_browsing_by_gender_and_age_uses_user_browse_idx(self):
+        plan = self.explain(
+            User.objects.filter(is_staff=False,
+                                is_active=True,
+                                gender='female',
+                                date_of_birth__lte=date(1980, 1, 1),
+                                date_of_birth__gt=date(1970, 1, 1)))
+
+        self.assertIn('user_browse_idx', plan)
+
+    def test_marking_messages_as_seen_uses_chat_message_unseen_idx(self):
+        plan = self.explain(
+            ChatMessage.objects.filter(chat_room=self.chat_room,
+                                       recipient=self.users[1],
+                                       seen=False))
+
+        self.assertIn('chat_message_unseen_idx', plan)
+
+    def test_filtering_by_age_uses_user_age_idx_range_scan(self):
+        plan = self.explain(
+            filter_users(User.objects.filter(is_staff=False, is_active=True),
+                         min_age=30,
+                         max_age=40))
+
+        self.assertIn('user_age_idx', plan)
+        self.assertRegex(plan, r'Index Cond: .*date_of_birth')
+
+
+class ImageUploadTests(SimpleTestCase):
+    """
+    Checks that uploaded images are validated while being streamed
+    """
+    def upload(self, data):
+        body = encode_multipart(
+            BOUNDARY,
+            {'image': SimpleUploadedFile('photo.jpg', data, 'image/jpeg')})
+
+        handler = ImageUploadHandler()
+
+        parser = MultiPartParser(
+            {
+                'CONTENT_TYPE': MULTIPART_CONTENT,
+                'CONTENT_LENGTH': len(body)
+            }, BytesIO(body), [handler])
+
+        _, files = parser.parse()
+
+        image = files.get('image')
+
+        if isinstance(image, ValidatedImage):
+            image.close()
+            self.addCleanup(remove_upload, image.upload_name)
+
+        return handler, image
+
+    def test_jpeg_with_large_metadata_is_accepted(self):
+        output = BytesIO()
+
+        Image.new('RGB', (800, 600)).save(output,
+                                          'JPEG',
+                                          exif=b'Exif\x00\x00' +
+                                          b'\x00' * 50 * 1024,
+                                          icc_profile=b'\x00' * 30 * 1024)
+
+        data = output.getvalue()
+
+        # the dimensions are past the first chunk read by the parser
+        self.assertIsNone(sniff_image(data[:64 * 1024]))
+
+        handler, image = self.upload(data)
+
+        self.assertIsNone(handler.error)
+        self.assertIsInstance(image, ValidatedImage)
+        self.assertEqual(image.size, len(data))
+
+    def test_invalid_image_is_rejected(self):
+        handler, _ = self.upload(b'not an image' * 1024)
+
+        self.assertEqual(handler.error, 'Please upload a valid image file')
+
+
+def destination(latitude, longitude, distance, bearing):
+    """
+    Gets the location `distance` kilometers away from a location in the direction of `bearing` degrees
+    """
+    lat = math.radians(latitude)
+    angle = distance / EARTH_RADIUS
+    bearing = math.radians(bearing)
+
+    dest_lat = math.asin(
+        math.sin(lat) * math.cos(angle) +
+        math.cos(lat) * math.sin(angle) * math.cos(bearing))
+
+    dest_lng = math.radians(longitude) + math.atan2(
+        math.sin(bearing) * math.sin(angle) * math.cos(lat),
+        math.cos(angle) - math.sin(lat) * math.sin(dest_lat))
+
+    return math.degrees(dest_lat), (math.degrees(dest_lng) + 540.0) % 360.0 - 180.0
+
+
+class GeohashCoveringTests(SimpleTestCase):
+    """
+    Checks that the geohash prefixes of a search cover its whole circle
+    """
+    def test_circle_is_covered(self):
+        for latitude, longitude in ((48.8566, 2.3522), (-33.87, 151.21),
+                                    (64.13, -21.9), (0.0, 179.99), (89.5,
+                                                                    10.0)):
+            for radius in (1, 10, 50, 500):
+                prefixes = covering_geohashes(latitude, longitude, radius)
+
+                if prefixes is None:
+                    continue
+
+                for bearing in range(0, 360, 10):
+                    geohash = encode_geohash(*destination(
+                        latitude, longitude, radius * 0.999, bearing))
+
+                    self.assertTrue(
+                        any(geohash.startswith(prefix)
+                            for prefix in prefixes),
+                        (latitude, longitude, radius, bearing))
+
+
+class NearbyTests(TestCase):
+    """
+    Checks the search of nearby users and the protection of their locations
+    """
+    def create_user(self, username, latitude, longitude):
+        return User.objects.create(username=username,
+                                   password='!',
+                                   first_name='first',
+                                   last_name='last',
+                                   gender='female',
+                                   date_of_birth=date(1990, 1, 1),
+                                   latitude=latitude,
+                                   longitude=longitude)
+
+    def nearby(self, latitude, longitude, radius):
+        return list(
+            filter_nearby(User.objects.all(), latitude, longitude,
+                          radius).values_list('username', flat=True))
+
+    def test_users_within_radius_are_ordered_by_distance(self):
+        self.create_user('edge', *destination(48.8566, 2.3522, 9, 0))
+        self.create_user('near', *destination(48.8566, 2.3522, 5, 90))
+        self.create_user('far', *destination(48.8566, 2.3522, 15, 180))
+
+        self.assertEqual(self.nearby(48.8566, 2.3522, 10), ['near', 'edge'])
+
+    def test_search_crosses_the_antimeridian(self):
+        self.create_user('east', 0.0, -179.99)
+        self.create_user('far', 0.0, 179.5)
+
+        self.assertEqual(self.nearby(0.0, 179.99, 5), ['east'])
+
+    def test_stored_locations_are_snapped_to_the_grid(self):
+        user = self.create_user('user', 48.856613, 2.352222)
+
+        user.refresh_from_db()
+
+        self.assertEqual((user.latitude, user.longitude), (48.86, 2.35))
+        self.assertEqual(user.geohash, encode_geohash(48.86, 2.35))
+
+    def test_radius_below_minimum_is_rejected(self):
+        request = Request(APIRequestFactory().get('/', {
+            'near': '48.8566,2.3522',
+            'radius': '0.1'
+        }))
+
+        with self.assertRaises(serializers.ValidationError):
+            get_location(request)
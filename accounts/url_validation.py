@@ -0,0 +1,79 @@
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import requests
+from rest_framework import status
+
+from DatingAppBackend import settings
+from DatingAppBackend.redis_pool import get_redis
+
+# content types of the images accepted as profile photos
+IMAGE_FORMATS = ("image/png", "image/jpeg", "image/jpg")
+
+_executor = ThreadPoolExecutor(max_workers=settings.URL_VALIDATION_WORKERS,
+                               thread_name_prefix='url_validation')
+
+# bounds the number of validations running or waiting for a worker
+_slots = threading.BoundedSemaphore(settings.URL_VALIDATION_MAX_PENDING)
+
+_session = requests.Session()
+
+
+def _cache_key(image_url):
+    return 'image_url_' + hashlib.sha256(image_url.encode()).hexdigest()
+
+
+def _check(image_url):
+    try:
+        response = _session.head(image_url,
+                                 timeout=settings.URL_VALIDATION_TIMEOUT)
+    except (requests.exceptions.MissingSchema,
+            requests.exceptions.InvalidSchema, requests.exceptions.InvalidURL):
+        return False
+    except requests.RequestException:
+        # timeouts and transport errors say nothing about the URL
+        return None
+    finally:
+        _slots.release()
+
+    content_type = response.headers.get('content-type', '')
+
+    return response.status_code == status.HTTP_200_OK and content_type.split(
+        ';')[0].strip().lower() in IMAGE_FORMATS
+
+
+def is_url_image(image_url):
+    """
+    Checks whether the URL points to an image, caching the result by URL. \n
+    The remote host is asked in a bounded pool of threads for at most `URL_VALIDATION_TIMEOUT` seconds,
+    returns None without caching if it could not be asked or did not answer in time.
+    """
+    redis = get_redis()
+
+    key = _cache_key(image_url)
+
+    cached = redis.get(key)
+
+    if cached is not None:
+        return cached == '1'
+
+    if not _slots.acquire(blocking=False):
+        return None
+
+    future = _executor.submit(_check, image_url)
+
+    try:
+        result = future.result(timeout=settings.URL_VALIDATION_TIMEOUT)
+    except TimeoutError:
+        result = None
+
+    if result is None:
+        return None
+
+    redis.set(key,
+              '1' if result else '0',
+              ex=settings.URL_VALIDATION_CACHE_TTL
+              if result else settings.URL_VALIDATION_NEGATIVE_CACHE_TTL)
+
+    return result
@@ -13,11 +13,17 @@ urlpatterns = [
     path('register/', views.register, name='register_user'),
     path('users/', views.get_users, name='get_users_list'),
     path('users/<name>', views.get_users, name='get_user'),
+    path('search-users/', views.search_users, name='search_users'),
     path('like-user/', views.like_user, name='like_user'),
+    path('has-liked/', views.has_liked_bulk, name='has_liked_bulk'),
     path('has-liked/<name>', views.has_liked, name='has_liked'),
+    path('matches/', views.get_matches, name='get_matches'),
     path('unlike-user/', views.unlike_user, name='unlike_user'),
     path('get-photos/<name>', views.get_photos, name='get_photos'),
     path('add-photo/', views.add_photo, name='add_photo'),
     path('delete-photo/', views.delete_photo, name='delete_photo'),
+    path('photo-status/<path:public_id>',
+         views.get_photo_status,
+         name='get_photo_status'),
     path('edit-profile/', views.edit_profile, name='edit_profile'),
 ]
\ No newline at end of file
@@ -0,0 +1,235 @@
+import base64
+import copy
+import logging
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.db import transaction
+from redis import RedisError
+
+from DatingAppBackend import settings
+from DatingAppBackend.redis_pool import get_redis
+
+from accounts.models import User
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+
+# user id (as string) -> (expiry time, `User`) in least recently used order
+_users = OrderedDict()
+
+_stats = {'local_hits': 0, 'redis_hits': 0, 'misses': 0}
+
+# number of evictions so far, users read before an eviction are not stored as they may be stale
+_generation = 0
+
+# monotonic time the stats were last logged at
+_stats_logged_at = time.monotonic()
+
+# channel on which the ids of invalidated users are published to every process
+INVALIDATION_CHANNEL = 'user_cache_invalidations'
+
+# id of the process the invalidation listener runs in
+_listener_pid = None
+
+
+def _redis_key(user_id):
+    return 'user_cache_entry_' + str(user_id)
+
+
+def _count(stat):
+    global _stats_logged_at
+
+    with _lock:
+        _stats[stat] += 1
+
+        if time.monotonic(
+        ) - _stats_logged_at < settings.USER_CACHE_STATS_INTERVAL:
+            return
+
+        _stats_logged_at = time.monotonic()
+
+    logger.info('user cache stats: %s', get_stats())
+
+
+def _store_local(user_id, user, generation, ttl=None):
+    ttl = settings.USER_CACHE_TTL if ttl is None else min(
+        ttl, settings.USER_CACHE_TTL)
+
+    with _lock:
+        if generation != _generation:
+            return
+
+        _users[str(user_id)] = (time.monotonic() + ttl, user)
+        _users.move_to_end(str(user_id))
+
+        while len(_users) > settings.USER_CACHE_SIZE:
+            _users.popitem(last=False)
+
+
+def _evict_local(user_id=None):
+    global _generation
+
+    with _lock:
+        _generation += 1
+
+        if user_id is None:
+            _users.clear()
+        else:
+            _users.pop(str(user_id), None)
+
+
+def _listen():
+    while True:
+        try:
+            pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(INVALIDATION_CHANNEL)
+
+            # invalidations published while not subscribed are lost
+            _evict_local()
+
+            for message in pubsub.listen():
+                _evict_local(message['data'])
+
+        except RedisError as error:
+            logger.warning('user cache invalidations lost: %s', error)
+            _evict_local()
+            time.sleep(1)
+
+
+def _start_listener():
+    """
+    Starts listening to invalidations once per process, processes forked after it was started listen on their own
+    """
+    global _listener_pid
+
+    with _lock:
+        if _listener_pid == os.getpid():
+            return
+
+        _listener_pid = os.getpid()
+
+    threading.Thread(target=_listen,
+                     name='user_cache_invalidations',
+                     daemon=True).start()
+
+
+def get_local_user(user_id):
+    """
+    Gets a copy of the `User` from the in-process cache, returns None if not cached
+    """
+    _start_listener()
+
+    with _lock:
+        entry = _users.get(str(user_id))
+
+        if entry is None:
+            return None
+
+        expires_at, user = entry
+
+        if expires_at < time.monotonic():
+            del _users[str(user_id)]
+            return None
+
+        _users.move_to_end(str(user_id))
+
+    _count('local_hits')
+
+    return copy.copy(user)
+
+
+def get_user(user_id):
+    """
+    Gets a copy of the `User` from the in-process cache, then from Redis if enabled and finally from the database
+    """
+    user = get_local_user(user_id)
+
+    if user is not None:
+        return user
+
+    generation = _generation
+
+    if settings.USER_CACHE_REDIS:
+        data = get_redis().get(_redis_key(user_id))
+
+        if data is not None:
+            # the shared client decodes responses, so entries are stored as base64 text
+            expires_at, user = pickle.loads(base64.b64decode(data))
+            _count('redis_hits')
+
+            # the entry is not kept locally for longer than it is left in Redis
+            _store_local(user_id, user, generation,
+                         expires_at - time.time())
+            return copy.copy(user)
+
+    _count('misses')
+
+    user = User.objects.filter(id=user_id).first()
+
+    if user is None:
+        return None
+
+    _store_local(user_id, user, generation)
+
+    if settings.USER_CACHE_REDIS:
+        get_redis().set(_redis_key(user_id),
+                        base64.b64encode(
+                            pickle.dumps((time.time() +
+                                          settings.USER_CACHE_TTL,
+                                          user))).decode(),
+                        ex=settings.USER_CACHE_TTL)
+
+    return copy.copy(user)
+
+
+def invalidate(user_id):
+    """
+    Removes the `User` from the caches of every process
+    """
+    _evict_local(user_id)
+
+    pipe = get_redis().pipeline(transaction=False)
+
+    if settings.USER_CACHE_REDIS:
+        pipe.delete(_redis_key(user_id))
+
+    pipe.publish(INVALIDATION_CHANNEL, str(user_id))
+    pipe.execute()
+
+
+def get_stats():
+    """
+    Gets the hit counters and the hit ratio of the caches
+    """
+    with _lock:
+        stats = dict(_stats)
+
+    total = stats['local_hits'] + stats['redis_hits'] + stats['misses']
+
+    stats['hit_ratio'] = (stats['local_hits'] +
+                          stats['redis_hits']) / total if total > 0 else 0.0
+
+    return stats
+
+
+def _invalidate_committed(user_id):
+    # the change is already committed, cached copies are left to expire after `USER_CACHE_TTL`
+    try:
+        invalidate(user_id)
+    except RedisError as error:
+        logger.warning('user %s could not be invalidated: %s', user_id,
+                       error)
+
+
+def invalidate_saved_user(sender, instance, **kwargs):
+    """
+    Signal receiver invalidating a `User` whenever it is saved or deleted, once the change is committed
+    """
+    user_id = instance.id
+
+    transaction.on_commit(lambda: _invalidate_committed(user_id))
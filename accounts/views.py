@@ -1,27 +1,47 @@
 from datetime import datetime
+import math
 import re
 from django.http.response import Http404, HttpResponse
-import requests
-import imghdr
+from django.db.models import Exists, OuterRef
 from django.shortcuts import get_object_or_404
 from rest_framework import status
 from rest_framework.decorators import api_view, authentication_classes, permission_classes
 from django.core.exceptions import ValidationError
-from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
 from rest_framework.response import Response
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
-from .models import Likes, Photo, User
+from .models import DELETING, FAILED, PENDING, UPLOADED, Likes, Photo, User
 
-from .serializers import PhotoSerializer, UserSerializer, TokenObtainPairSerializer, TokenRefreshSerializer
+from .serializers import USER_VALUES, PhotoSerializer, UserSerializer, TokenObtainPairSerializer, TokenRefreshSerializer, get_photo_size, get_photos_by_user, serialize_user_values
 
-from .pagination import UserPagination
+from .pagination import MatchPagination, UserPagination, get_location
 
 from accounts.authentication import CustomAuthentication
 
+from accounts.discovery import DiscoveryPagination, remove_candidate
+
+from accounts.geo import filter_nearby
+
+from accounts.search import search_profiles, update_search_vector
+
+from accounts.storage import ImageUploadHandler, ValidatedImage, remove_upload, rename_upload
+
+from accounts.url_validation import is_url_image
+
+from accounts.tasks import remove_photo, upload_photo
+
 from DatingAppBackend import settings
 
-import cloudinary.uploader
+
+def add_photos(data, rows, size=None):
+    """
+    Adds the first photos of the `User`s to their serialized data, `rows` being their rows from `values()` with `id`
+    """
+    photos = get_photos_by_user([row['id'] for row in rows], size)
+
+    for user, row in zip(data, rows):
+        user['photos'] = photos[row['id']]
 
 
 @api_view(['GET'])
@@ -29,31 +49,94 @@ import cloudinary.uploader
 @authentication_classes([CustomAuthentication])
 def get_users(request, name=None, *args, **kwargs):
     """
-    Gets details of all or single `User`
+    Gets details of all or single `User`. \n
+    Authenticated `User`s discover the `User`s they have not liked yet by cursor if `cursor` is provided. \n
+    `User`s within `radius` kilometers of `near` are listed nearest first if `near` is provided. \n
+    The first photos of the `User`s are included if `include` has `photos`.
     """
 
+    size = get_photo_size(request)
+
+    # first photos of the users are included in one query if `include` has photos
+    include_photos = 'photos' in request.query_params.get('include',
+                                                          '').split(',')
+
     serializer_context = {
         'request': request,
+        'size': size,
     }
 
+    if name is None and 'cursor' in request.query_params and request.user.is_authenticated:
+        paginator = DiscoveryPagination()
+        result = paginator.paginate_queryset(request.user, request)
+        data = serialize_user_values(result, size)
+
+        if include_photos:
+            add_photos(data, result, size)
+
+        return paginator.get_paginated_response(data)
+
     if name is None:
         user_name = ''
 
         if request.user.is_authenticated:
             user_name = request.user.username
 
-        data = User.objects.filter(is_staff=False,
-                                   is_active=True).exclude(username=user_name)
+        data = User.objects.filter(
+            is_staff=False, is_active=True).exclude(username=user_name)
+
+        location = get_location(request)
+
+        if location is not None:
+            data = filter_nearby(data, *location)
+
+        data = data.values('id', *USER_VALUES)
         paginator = UserPagination()
         result = paginator.paginate_queryset(data, request)
-        serializer = UserSerializer(result,
-                                    many=True,
-                                    context=serializer_context)
-    else:
-        data = get_object_or_404(User, username=name)
-        serializer = UserSerializer(data, context=serializer_context)
+        data = serialize_user_values(result, size)
 
-    return Response(serializer.data)
+        if include_photos:
+            add_photos(data, result, size)
+
+        return Response(data)
+
+    user = get_object_or_404(User, username=name)
+    serializer = UserSerializer(user, context=serializer_context)
+    data = serializer.data
+
+    if include_photos:
+        data['photos'] = get_photos_by_user([user.id], size)[user.id]
+
+    return Response(data)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticatedOrReadOnly])
+@authentication_classes([CustomAuthentication])
+def search_users(request, *args, **kwargs):
+    """
+    Searches the introduction, interests and looking for preference of `User`s, best matches first
+    """
+
+    text = request.query_params.get('q', '').strip()
+
+    if text == '':
+        return Response('Please send a search query in q',
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    user_name = ''
+
+    if request.user.is_authenticated:
+        user_name = request.user.username
+
+    data = search_profiles(
+        User.objects.filter(is_staff=False,
+                            is_active=True).exclude(username=user_name),
+        text).values(*USER_VALUES)
+    paginator = UserPagination()
+    result = paginator.paginate_queryset(data, request)
+
+    return Response(serialize_user_values(result, get_photo_size(request)))
 
 
 @api_view(['GET'])
@@ -69,10 +152,12 @@ def get_photos(request, name, *args, **kwargs):
             or user.is_active == False) and request.user.is_staff == False:
         return Response('Unauthorized', status=status.HTTP_401_UNAUTHORIZED)
 
-    data = Photo.objects.filter(user=user)
+    data = Photo.objects.filter(user=user, status=UPLOADED)
     paginator = UserPagination()
     result = paginator.paginate_queryset(data, request)
-    serializer = PhotoSerializer(result, many=True)
+    serializer = PhotoSerializer(result,
+                                 many=True,
+                                 context={'size': get_photo_size(request)})
 
     return Response(serializer.data)
 
@@ -97,11 +182,11 @@ def has_liked(request, name, *args, **kwargs):
         inverse = request.query_params.get('inverse')
 
         if inverse is not None and Likes.objects.filter(
-                liked_by=other_user, liked_on=user).first() is not None:
+                liked_by=other_user, liked_on=user).exists():
             result = True
 
         elif Likes.objects.filter(liked_by=user,
-                                  liked_on=other_user).first() is not None:
+                                  liked_on=other_user).exists():
             result = True
 
     except Http404:
@@ -114,6 +199,65 @@ def has_liked(request, name, *args, **kwargs):
     return Response(result)
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def has_liked_bulk(request, *args, **kwargs):
+    """
+    Check for many `User`s whether current `User` has liked them and whether they have liked current `User`
+    """
+
+    user = request.user
+
+    usernames = request.data.get('usernames') if isinstance(
+        request.data, dict) else None
+
+    if type(usernames) != list or any(
+            type(username) != str for username in usernames):
+        return Response('Please send a list of usernames in body',
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    if len(usernames) > settings.HAS_LIKED_MAX_USERNAMES:
+        return Response('Please send at most {0} usernames'.format(
+            settings.HAS_LIKED_MAX_USERNAMES),
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    liked = Likes.objects.filter(liked_by=user, liked_on=OuterRef('pk'))
+    liked_back = Likes.objects.filter(liked_by=OuterRef('pk'), liked_on=user)
+
+    rows = User.objects.filter(username__in=usernames,
+                               is_active=True).annotate(
+                                   liked=Exists(liked),
+                                   liked_back=Exists(liked_back)).values(
+                                       'username', 'liked', 'liked_back')
+
+    return Response({
+        row['username']: {
+            'liked': row['liked'],
+            'inverse': row['liked_back']
+        }
+        for row in rows
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_matches(request, *args, **kwargs):
+    """
+    Gets the `User`s who liked current `User` and were liked back
+    """
+
+    user = request.user
+
+    data = User.objects.filter(
+        is_staff=False, is_active=True, liked_on__liked_by=user,
+        liked_by__liked_on=user).values(*USER_VALUES)
+    paginator = MatchPagination()
+    result = paginator.paginate_queryset(data, request)
+
+    return paginator.get_paginated_response(
+        serialize_user_values(result, get_photo_size(request)))
+
+
 @api_view(['POST'])
 @authentication_classes([])
 def register(request, *args, **kwargs):
@@ -138,6 +282,8 @@ def register(request, *args, **kwargs):
             date_of_birth=date,
             check_for_validation=True)
 
+        update_search_vector(User.objects.filter(id=user.id))
+
     except ValidationError as e:
         return Response(e, status=status.HTTP_400_BAD_REQUEST)
     except ValueError as e:
@@ -156,38 +302,97 @@ def register(request, *args, **kwargs):
 @api_view(['POST'])
 def add_photo(request, *args, **kwargs):
     """
-    Add a new `Photo` for current `User`
+    Add a new `Photo` for current `User`. \n
+    The image is uploaded in background, the `Photo` stays pending until then.
     """
 
-    image_file = request.data['image']
+    # the image is validated and hashed while the request body is parsed
+    handler = ImageUploadHandler(request._request)
+    request._request.upload_handlers.insert(0, handler)
+
+    image_file = request.data.get('image') if isinstance(request.data,
+                                                         dict) else None
+
+    if handler.error is not None:
+        if isinstance(image_file, ValidatedImage):
+            remove_upload(image_file.upload_name)
+
+        return Response(handler.error, status=status.HTTP_400_BAD_REQUEST)
+
+    if image_file is None:
+        return Response("'image' field should not be empty",
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    if not isinstance(image_file, ValidatedImage):
+        return Response("'image' field should be an image file",
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    name = image_file.upload_name
+
+    # pending photo created for the upload, removed again if it cannot be queued
+    new_photo = None
 
     try:
 
-        if imghdr.what(image_file) is None:
-            raise Exception('Please upload a valid image file')
+        content_hash = image_file.content_hash
 
-        cloudinary_upload_response = cloudinary.uploader.upload(
-            image_file, folder="files/" + str(request.user.id) + "/photos")
+        # the same image was already uploaded by the user
+        photo = Photo.objects.filter(
+            user=request.user, content_hash=content_hash).exclude(
+                status__in=[FAILED, DELETING]).first()
 
-        photo = Photo(image=cloudinary_upload_response['secure_url'],
-                      public_id=cloudinary_upload_response['public_id'],
-                      user=request.user)
+        if photo is not None:
+            remove_upload(name)
 
-        # check for validation
-        photo.full_clean()
+            return Response({
+                'image': photo.image or None,
+                'id': photo.public_id,
+                'status': photo.status
+            })
 
-        photo.save()
+        public_id = 'files/{0}/photos/{1}'.format(request.user.id, name)
+
+        new_photo = Photo(public_id=public_id,
+                          status=PENDING,
+                          content_hash=content_hash,
+                          user=request.user)
+
+        new_photo.save()
+
+        rename_upload(name, new_photo.id)
+
+        upload_photo.delay(new_photo.id)
 
-    except FileNotFoundError:
-        return Response("'image' field should not be empty",
-                        status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
+        remove_upload(name)
+
+        if new_photo is not None and new_photo.id is not None:
+            remove_upload(new_photo.id)
+            new_photo.delete()
+
         return Response('Sorry, something went wrong. Please try again later',
                         status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
     return Response({
-        'image': cloudinary_upload_response['secure_url'],
-        'id': cloudinary_upload_response['public_id']
+        'image': None,
+        'id': new_photo.public_id,
+        'status': new_photo.status
+    },
+                    status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['GET'])
+def get_photo_status(request, public_id, *args, **kwargs):
+    """
+    Gets the upload status of a `Photo` of current `User`
+    """
+
+    photo = get_object_or_404(Photo, user=request.user, public_id=public_id)
+
+    return Response({
+        'image': photo.image or None,
+        'id': photo.public_id,
+        'status': photo.status
     })
 
 
@@ -207,10 +412,9 @@ def like_user(request, *args, **kwargs):
         if to_be_liked.is_active == False:
             raise Http404
 
-        if Likes.objects.filter(liked_by=user,
-                                liked_on=to_be_liked).first() is None:
-            like = Likes(liked_by=user, liked_on=to_be_liked)
-            like.save()
+        Likes.objects.get_or_create(liked_by=user, liked_on=to_be_liked)
+
+        remove_candidate(user.id, to_be_liked.id)
 
     except KeyError:
         return Response('Please send a valid username in body',
@@ -241,10 +445,7 @@ def unlike_user(request, *args, **kwargs):
         if liked_on.is_active == False:
             raise Http404
 
-        like = Likes.objects.filter(liked_by=user, liked_on=liked_on).first()
-
-        if like is not None:
-            like.delete()
+        Likes.objects.filter(liked_by=user, liked_on=liked_on).delete()
 
     except KeyError:
         return Response('Please send a valid username in body',
@@ -259,15 +460,6 @@ def unlike_user(request, *args, **kwargs):
     return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-def is_url_image(image_url):
-    image_formats = ("image/png", "image/jpeg", "image/jpg")
-    r = requests.head(image_url)
-    if r.status_code == status.HTTP_200_OK and r.headers[
-            "content-type"] in image_formats:
-        return True
-    return False
-
-
 @api_view(['PUT'])
 def edit_profile(request, *args, **kwargs):
     """
@@ -286,6 +478,23 @@ def edit_profile(request, *args, **kwargs):
         if 'country' in data:
             user.country = data['country'].strip()
 
+        if 'latitude' in data or 'longitude' in data:
+            if 'latitude' not in data or 'longitude' not in data:
+                return Response(
+                    'Please send both latitude and longitude',
+                    status=status.HTTP_400_BAD_REQUEST)
+
+            if data['latitude'] is None and data['longitude'] is None:
+                user.latitude = None
+                user.longitude = None
+            else:
+                user.latitude = float(data['latitude'])
+                user.longitude = float(data['longitude'])
+
+                if not (math.isfinite(user.latitude)
+                        and math.isfinite(user.longitude)):
+                    raise ValueError('Location should be finite')
+
         if 'lookingFor' in data:
             user.looking_for = data['lookingFor'].strip()
 
@@ -306,13 +515,31 @@ def edit_profile(request, *args, **kwargs):
 
         if 'mainPhoto' in data:
             img = data['mainPhoto'].strip()
+
             if img == '':
                 img = settings.DEFAULT_PROFILE_URL
-            elif is_url_image(img) is False:
-                return Response('Please send a valid URL for profile photo',
-                                status=status.HTTP_400_BAD_REQUEST)
+
+            # uploaded photos of the user are known images, variants are available for them
+            photo = Photo.objects.filter(user=user,
+                                         image=img,
+                                         status=UPLOADED).first()
+
+            if photo is None and img != settings.DEFAULT_PROFILE_URL:
+                is_image = is_url_image(img)
+
+                if is_image is None:
+                    return Response(
+                        'Sorry, something went wrong. Please try again later',
+                        status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+                elif is_image is False:
+                    return Response(
+                        'Please send a valid URL for profile photo',
+                        status=status.HTTP_400_BAD_REQUEST)
 
             user.main_photo = img
+            user.main_photo_thumbnail = photo.thumbnail if photo else ''
+            user.main_photo_medium = photo.medium if photo else ''
 
         # check for validation
 
@@ -320,8 +547,15 @@ def edit_profile(request, *args, **kwargs):
 
         user.save()
 
+        if 'introduction' in data or 'interests' in data or \
+            'lookingFor' in data:
+            update_search_vector(User.objects.filter(id=user.id))
+
     except ValidationError as e:
         return Response(e, status=status.HTTP_400_BAD_REQUEST)
+    except (TypeError, ValueError):
+        return Response('Please send valid latitude and longitude',
+                        status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         return Response('Sorry, something went wrong. Please try again later',
                         status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -334,26 +568,24 @@ def edit_profile(request, *args, **kwargs):
 @api_view(['DELETE'])
 def delete_photo(request, *args, **kwargs):
     """
-    Delete `Photo` for current `User`
+    Delete `Photo` for current `User`. \n
+    The image is removed in background.
     """
 
     if 'id' not in request.data:
         return Response('id of the image not provided',
                         status=status.HTTP_400_BAD_REQUEST)
 
-    photo = get_object_or_404(Photo,
+    photo = get_object_or_404(Photo.objects.exclude(status=DELETING),
                               user=request.user,
                               public_id=request.data['id'])
 
-    response = cloudinary.uploader.destroy(public_id=request.data['id'])
+    photo.status = DELETING
+    photo.save(update_fields=['status'])
 
-    if response['result'] == 'ok':
-        photo.delete()
-    else:
-        return Response('Sorry, something went wrong. Please try again later',
-                        status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    remove_photo.delay(photo.id)
 
-    return Response(status=status.HTTP_204_NO_CONTENT)
+    return Response(status=status.HTTP_202_ACCEPTED)
 
 
 @authentication_classes([])
@@ -0,0 +1,133 @@
+import argparse
+import os
+import statistics
+import time
+
+import django
+
+
+def setup_django():
+    """
+    Sets up Django for the benchmarks that do not need a database
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE',
+                          'DatingAppBackend.settings')
+    django.setup()
+
+
+def setup():
+    """
+    Sets up Django and creates the test databases the benchmarks run against, returns their config for `teardown`
+    """
+    setup_django()
+
+    from django.test.utils import setup_databases, setup_test_environment
+
+    setup_test_environment()
+
+    return setup_databases(verbosity=0, interactive=False)
+
+
+def teardown(old_config):
+    """
+    Destroys the test databases created by `setup`
+    """
+    from django.test.utils import teardown_databases, teardown_test_environment
+
+    teardown_databases(old_config, verbosity=0)
+    teardown_test_environment()
+
+
+def create_users(count, batch_size=10000, **fields):
+    """
+    Replaces the `User`s with `count` `User`s created in batches with varied gender, birth date and activity,
+    `fields` mapping other fields to functions of the index of the `User`. \n
+    The tables are analyzed so that the planner sees their real size. Returns the first `User`.
+    """
+    from datetime import date, timedelta
+
+    from django.db import connection
+    from django.utils import timezone
+
+    from accounts.models import User
+
+    # start from an empty table, the rows referencing users go with them
+    with connection.cursor() as cursor:
+        cursor.execute('TRUNCATE {0} CASCADE'.format(User._meta.db_table))
+
+    now = timezone.now()
+
+    for offset in range(0, count, batch_size):
+        User.objects.bulk_create([
+            User(username='user{0}'.format(i),
+                 password='!',
+                 first_name='first',
+                 last_name='last',
+                 gender='female' if i % 2 else 'male',
+                 date_of_birth=date(1960 + i % 40, 1 + i % 12, 1 + i % 28),
+                 last_active=now - timedelta(seconds=i),
+                 **{name: make(i)
+                    for name, make in fields.items()})
+            for i in range(offset, min(count, offset + batch_size))
+        ])
+
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+    return User.objects.get(username='user0')
+
+
+def parse_sizes(description, default):
+    """
+    Parses the row counts to benchmark from the command line
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('sizes',
+                        nargs='*',
+                        type=int,
+                        default=default,
+                        help='row counts (default: {0})'.format(' '.join(
+                            str(size) for size in default)))
+
+    return parser.parse_args().sizes
+
+
+def best_time(function, repeat=5):
+    """
+    Gets the shortest time in seconds of `repeat` calls of the function
+    """
+    times = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    return min(times)
+
+
+def report(size, name, seconds, baseline=None, unit='rows'):
+    """
+    Prints the time and rate of a benchmarked function, with its speedup over the baseline time if given
+    """
+    line = '{0:>8} {4:<6} {1:<28} {2:>10.2f} ms  {3:>12,.0f} {4}/s'.format(
+        size, name, seconds * 1000, size / seconds, unit)
+
+    if baseline is not None:
+        line += '  x{0:.1f}'.format(baseline / seconds)
+
+    print(line)
+
+
+def report_latencies(size, name, latencies, unit='rows'):
+    """
+    Prints the mean, median and 99th percentile in milliseconds of the latencies (in seconds) of an operation
+    """
+    latencies = sorted(latencies)
+
+    print('{0:>8} {1:<6} {2:<28} mean {3:>8.3f} ms  p50 {4:>8.3f} ms  p99 {5:>8.3f} ms'.
+          format(size, unit, name,
+                 statistics.mean(latencies) * 1000,
+                 latencies[len(latencies) // 2] * 1000,
+                 latencies[min(len(latencies) - 1,
+                               len(latencies) * 99 // 100)] * 1000))
@@ -0,0 +1,112 @@
+"""
+Measures the latency of discovery pages of 100 users at increasing depths with 1M seeded users: served from the
+precomputed candidate set in Redis, from the database by keyset until the set is built, and by the limit/offset
+pagination `get_users` used before. Also times the build of the candidate set. \n
+Run from the project directory with Redis running: python -m benchmarks.discovery [users...]
+"""
+import time
+
+from benchmarks.common import best_time, create_users, parse_sizes, report, setup, teardown
+
+# number of users per page
+LIMIT = 100
+
+# number of users liked by the user discovering, who are left out of the candidates
+LIKES = 1000
+
+
+def get_cursors(key, size):
+    """
+    Gets the cursors of the pages starting at increasing depths of the candidate set, by depth
+    """
+    from datetime import datetime, timezone
+
+    from DatingAppBackend.redis_pool import get_redis
+
+    from accounts.discovery import encode_cursor
+
+    cursors = {0: ''}
+
+    for depth in (size // 100, size // 10, size // 2):
+        entry = get_redis().zrevrange(key, depth - 1, depth - 1,
+                                      withscores=True)
+
+        if len(entry) > 0:
+            (id, score), = entry
+            cursors[depth] = encode_cursor(
+                datetime.fromtimestamp(score, tz=timezone.utc), int(id))
+
+    return cursors
+
+
+def main():
+    sizes = parse_sizes(__doc__, [1000000])
+
+    old_config = setup()
+
+    try:
+        from DatingAppBackend import settings
+        from DatingAppBackend.redis_pool import get_redis
+
+        from accounts.discovery import build_candidates, candidate_keys_key, candidates_key, get_candidate_page
+        from accounts.models import Likes, User
+        from accounts.serializers import USER_VALUES
+
+        redis = get_redis()
+
+        for size in sizes:
+            user = create_users(size)
+
+            Likes.objects.bulk_create([
+                Likes(liked_by=user, liked_on=liked_on)
+                for liked_on in User.objects.filter(
+                    gender='female').order_by('id')[:LIKES]
+            ])
+
+            key = candidates_key(user.id, 'female', None, None)
+
+            try:
+                start = time.perf_counter()
+                build_candidates(user.id, 'female', None, None)
+                seconds = time.perf_counter() - start
+
+                candidates = redis.zcard(key)
+                report(candidates, 'build candidate set', seconds)
+
+                cursors = get_cursors(key, candidates)
+
+                for depth, cursor in cursors.items():
+                    report(LIMIT, 'set page at ' + str(depth),
+                           best_time(lambda: get_candidate_page(
+                               user.id, 'female', None, None, cursor, LIMIT
+                           )))
+
+                # pages are read from the database while the set is missing and its build is queued
+                redis.delete(key + '_built')
+                redis.set(key + '_building', 1,
+                          ex=settings.DISCOVERY_BUILD_TIMEOUT)
+
+                for depth, cursor in cursors.items():
+                    report(LIMIT, 'keyset page at ' + str(depth),
+                           best_time(lambda: get_candidate_page(
+                               user.id, 'female', None, None, cursor, LIMIT
+                           )))
+
+                queryset = User.objects.filter(
+                    is_active=True, is_staff=False,
+                    gender='female').exclude(id=user.id).values(
+                        'id', *USER_VALUES)
+
+                for depth in cursors:
+                    report(LIMIT, 'offset page at ' + str(depth),
+                           best_time(lambda: list(queryset[depth:depth +
+                                                           LIMIT])))
+            finally:
+                redis.delete(key, key + '_built', key + '_building',
+                             candidate_keys_key(user.id))
+    finally:
+        teardown(old_config)
+
+
+if __name__ == '__main__':
+    main()
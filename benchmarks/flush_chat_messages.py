@@ -0,0 +1,131 @@
+"""
+Compares the rows/sec of syncing buffered chat messages with the database through `build_chat_messages` and
+`bulk_create` against saving them one by one after `full_clean()`, as `update_chat_db` used to. \n
+Run from the project directory: python -m benchmarks.flush_chat_messages [sizes...]
+"""
+from datetime import date, timedelta
+
+from benchmarks.common import best_time, parse_sizes, report, setup, teardown
+
+
+def make_messages(size, user1, user2):
+    """
+    Makes `size` buffered messages the way the chat consumers store them
+    """
+    from django.utils import timezone
+
+    now = timezone.now()
+
+    return [{
+        'messageType': 'text',
+        'sender': user1.username if i % 2 else user2.username,
+        'recipient': user2.username if i % 2 else user1.username,
+        'createdAt': (now + timedelta(milliseconds=i)).isoformat(),
+        'seen': i % 3 == 0,
+        'content': 'message {0}'.format(i)
+    } for i in range(size)]
+
+
+def save_per_message(messages, chat_room, user1, user2):
+    """
+    Saves the messages one by one after `full_clean()`, as `update_chat_db` did before it used `bulk_create`
+    """
+    from dateutil import parser
+
+    from chat.models import ChatMessage, MESSAGE_TYPE
+
+    last_chat_message = None
+
+    for message in messages:
+        message_type = message['messageType'].lower()
+
+        chat_message = ChatMessage(
+            message_type=message_type,
+            sender=user1 if user1.username.lower() ==
+            message['sender'].lower() else user2,
+            recipient=user1 if user1.username.lower() ==
+            message['recipient'].lower() else user2,
+            created_at=parser.parse(message['createdAt']),
+            seen=True if message['seen'] else False,
+            content=message['content'],
+            chat_room=chat_room)
+
+        if not any(allowed_type[0].lower() == message_type
+                   for allowed_type in MESSAGE_TYPE):
+            continue
+
+        chat_message.full_clean()
+        chat_message.save()
+
+        last_chat_message = chat_message
+
+    if last_chat_message is not None:
+        chat_room.last_chat_message = last_chat_message
+        chat_room.save()
+
+
+def bulk_create_messages(messages, chat_room, user1, user2):
+    """
+    Saves the messages the way `update_chat_db` does
+    """
+    from django.db import transaction
+
+    from DatingAppBackend import settings
+
+    from chat.models import ChatMessage
+    from chat.tasks import build_chat_messages
+
+    with transaction.atomic():
+        chat_messages = ChatMessage.objects.bulk_create(
+            build_chat_messages(messages, chat_room, user1, user2),
+            batch_size=settings.CHAT_DB_BATCH_SIZE)
+
+        chat_room.last_chat_message = chat_messages[-1]
+        chat_room.save(update_fields=['last_chat_message'])
+
+
+def main():
+    sizes = parse_sizes(__doc__, [1000, 10000, 100000])
+
+    old_config = setup()
+
+    try:
+        from accounts.models import User
+        from chat.models import ChatRoom
+
+        user1, user2 = User.objects.bulk_create([
+            User(username='benchmark{0}'.format(i),
+                 password='!',
+                 first_name='first',
+                 last_name='last',
+                 gender='male',
+                 date_of_birth=date(1990, 1, 1)) for i in (1, 2)
+        ])
+
+        for size in sizes:
+            messages = make_messages(size, user1, user2)
+
+            baseline = None
+
+            for name, function in (('full_clean() + save()',
+                                    save_per_message),
+                                   ('bulk_create()', bulk_create_messages)):
+                # every run writes to a new chat room, so each function is timed once per size
+                chat_room = ChatRoom.objects.create(
+                    chat_room_name='{0}_{1}_chat'.format(
+                        function.__name__, size),
+                    user1=user1,
+                    user2=user2)
+
+                seconds = best_time(lambda: function(messages, chat_room,
+                                                     user1, user2),
+                                    repeat=1)
+                report(size, name, seconds, baseline)
+
+                baseline = baseline or seconds
+    finally:
+        teardown(old_config)
+
+
+if __name__ == '__main__':
+    main()
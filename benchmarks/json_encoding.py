@@ -0,0 +1,97 @@
+"""
+Compares the time of encoding a page of users and a page of chat messages with the fast JSON helpers (orjson when
+installed) against the stdlib json paths they replaced, for REST responses and websocket frames. \n
+Run from the project directory: python -m benchmarks.json_encoding [sizes...]
+"""
+import json
+from datetime import timedelta
+
+from benchmarks.common import best_time, parse_sizes, report, setup_django
+
+
+def make_user_page(size):
+    """
+    Makes a page of `size` users shaped like the output of `serialize_user_values`
+    """
+    from django.utils import timezone
+
+    from accounts.serializers import serialize_datetime
+
+    now = timezone.now()
+
+    return [{
+        'username': 'user{0}'.format(i),
+        'introduction': 'Hello, I like hiking, cooking and café music ☕',
+        'gender': 'female' if i % 2 else 'male',
+        'interests': 'hiking, cooking',
+        'city': 'Zürich',
+        'country': 'Switzerland',
+        'age': 20 + i % 40,
+        'firstName': 'First',
+        'lastName': 'Last',
+        'dateOfBirth': '1990-01-01',
+        'lastActive': serialize_datetime(now - timedelta(minutes=i)),
+        'mainPhoto': 'https://res.cloudinary.com/demo/image/upload/user{0}'.
+        format(i),
+        'lookingFor': 'male' if i % 2 else 'female'
+    } for i in range(size)]
+
+
+def make_message_page(size):
+    """
+    Makes a page of `size` chat messages shaped like the output of `serialize_chat_message_values`
+    """
+    from django.utils import timezone
+
+    now = timezone.now()
+
+    return [{
+        'messageType': 'text',
+        'sender': 'user1' if i % 2 else 'user2',
+        'recipient': 'user2' if i % 2 else 'user1',
+        'createdAt': str(now + timedelta(seconds=i)),
+        'seen': i % 3 == 0,
+        'content': 'message {0} 👋'.format(i)
+    } for i in range(size)]
+
+
+def main():
+    sizes = parse_sizes(__doc__, [1000])
+
+    setup_django()
+
+    from rest_framework.renderers import JSONRenderer
+
+    from DatingAppBackend import fast_json
+    from DatingAppBackend.renderers import FastJSONRenderer
+
+    if fast_json.orjson is None:
+        print('orjson is not installed, the fast paths fall back to json')
+
+    for page_name, make_page in (('users', make_user_page),
+                                 ('messages', make_message_page)):
+        print(page_name)
+
+        for size in sizes:
+            page = make_page(size)
+
+            frame = {'type': 'messages', 'messages': page}
+
+            baseline = best_time(lambda: JSONRenderer().render(page),
+                                 repeat=20)
+            report(size, 'JSONRenderer', baseline)
+
+            report(size, 'FastJSONRenderer',
+                   best_time(lambda: FastJSONRenderer().render(page),
+                             repeat=20), baseline)
+
+            baseline = best_time(lambda: json.dumps(frame), repeat=20)
+            report(size, 'json.dumps() frame', baseline)
+
+            report(size, 'fast_json.dumps() frame',
+                   best_time(lambda: fast_json.dumps(frame), repeat=20),
+                   baseline)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Compares the time of reading and serializing pages of users and chat messages through `values()` and the fast
+serializers against model instances and `UserSerializer` / `ChatMessageSerializer`, checking that both produce the
+same output. \n
+Run from the project directory: python -m benchmarks.list_serializers [sizes...]
+"""
+from datetime import date
+
+from benchmarks.common import best_time, parse_sizes, report, setup, teardown
+
+
+def create_rows(count):
+    """
+    Creates `count` users and `count` chat messages between two of them, returns the chat room
+    """
+    from accounts.models import User
+    from chat.models import ChatMessage, ChatRoom, TEXT
+
+    users = User.objects.bulk_create([
+        User(username='user{0}'.format(i),
+             password='!',
+             first_name='first',
+             last_name='last',
+             gender='female' if i % 2 else 'male',
+             date_of_birth=date(1960 + i % 40, 1 + i % 12, 1 + i % 28),
+             main_photo='https://example.com/user{0}.jpg'.format(i),
+             main_photo_thumbnail='https://example.com/user{0}_thumbnail.jpg'.
+             format(i) if i % 2 else None) for i in range(count)
+    ])
+
+    chat_room = ChatRoom.objects.create(chat_room_name='user0_user1_chat',
+                                        user1=users[0],
+                                        user2=users[1])
+
+    ChatMessage.objects.bulk_create([
+        ChatMessage(message_type=TEXT,
+                    sender=users[i % 2],
+                    recipient=users[1 - i % 2],
+                    content='message {0}'.format(i),
+                    seen=i % 3 == 0,
+                    chat_room=chat_room) for i in range(count)
+    ])
+
+    return chat_room
+
+
+def main():
+    sizes = parse_sizes(__doc__, [100, 1000, 10000])
+
+    old_config = setup()
+
+    try:
+        from rest_framework.renderers import JSONRenderer
+
+        from accounts.models import User
+        from accounts.serializers import USER_VALUES, UserSerializer, serialize_user_values
+        from chat.models import ChatMessage
+        from chat.serializers import CHAT_MESSAGE_VALUES, ChatMessageSerializer, serialize_chat_message_values
+
+        chat_room = create_rows(max(sizes))
+
+        for size in sizes:
+            users = User.objects.order_by('id')[:size]
+
+            messages = ChatMessage.objects.filter(
+                chat_room=chat_room).order_by('-created_at', '-id')[:size]
+
+            cases = (
+                ('users', lambda: UserSerializer(
+                    users.all(), many=True, context={
+                        'size': 'thumbnail'
+                    }).data, lambda: serialize_user_values(
+                        users.values(*USER_VALUES), 'thumbnail')),
+                ('messages', lambda: ChatMessageSerializer(
+                    messages.select_related('sender', 'recipient'),
+                    many=True).data, lambda: serialize_chat_message_values(
+                        messages.values(*CHAT_MESSAGE_VALUES))),
+            )
+
+            for name, serialize, serialize_values in cases:
+                if JSONRenderer().render(serialize()) != JSONRenderer().render(
+                        serialize_values()):
+                    raise AssertionError(
+                        'The fast serializer of ' + name +
+                        ' does not match the model serializer')
+
+                baseline = best_time(serialize)
+                report(size, name + ' ModelSerializer', baseline)
+
+                report(size, name + ' values()', best_time(serialize_values),
+                       baseline)
+    finally:
+        teardown(old_config)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Measures the latency of appending a chat message to `ChatMessageStore` and of reading and trimming its buffer the
+way `update_chat_db` does, with 0, 1k and 10k messages already buffered, against the whole-list get/set store the
+chat consumers used before. \n
+Run from the project directory with Redis running: python -m benchmarks.message_store [sizes...]
+"""
+import asyncio
+import time
+
+from benchmarks.common import parse_sizes, report, report_latencies, setup_django
+
+# number of timed appends per buffer size
+APPENDS = 1000
+
+
+def make_message(i):
+    """
+    Makes a chat message the way the chat consumers buffer it
+    """
+    return {
+        'messageType': 'text',
+        'sender': 'benchmark1' if i % 2 else 'benchmark2',
+        'recipient': 'benchmark2' if i % 2 else 'benchmark1',
+        'createdAt': '2021-05-04T03:02:01.123456+00:00',
+        'seen': False,
+        'content': 'message {0}'.format(i)
+    }
+
+
+async def time_appends(append):
+    latencies = []
+
+    for i in range(APPENDS):
+        start = time.perf_counter()
+        await append(make_message(i))
+        latencies.append(time.perf_counter() - start)
+
+    return latencies
+
+
+async def benchmark(size):
+    from DatingAppBackend import fast_json
+    from DatingAppBackend.redis_pool import get_async_redis
+
+    from chat.stores import PENDING_FLUSH_KEY, ChatMessageStore, next_stream_id
+
+    redis = get_async_redis()
+
+    store = ChatMessageStore(redis, 'benchmark1', 'benchmark2')
+
+    # whole-list store of the previous chat consumers
+    list_key = store.key + '_list'
+
+    await redis.delete(store.key, store.seen_key, list_key)
+
+    try:
+        pipe = redis.pipeline(transaction=False)
+
+        for i in range(size):
+            pipe.xadd(store.key, {'data': fast_json.dumps(make_message(i))})
+
+        pipe.set(list_key,
+                 fast_json.dumps([make_message(i) for i in range(size)]))
+        await pipe.execute()
+
+        async def append_to_list(message):
+            messages = fast_json.loads(await redis.get(list_key))
+            messages.append(message)
+            await redis.set(list_key, fast_json.dumps(messages))
+
+        report_latencies(size, 'whole-list append',
+                         await time_appends(append_to_list))
+        report_latencies(size, 'ChatMessageStore.append',
+                         await time_appends(store.append))
+
+        buffered = size + APPENDS
+
+        # flush: read the buffer past the high-water mark, then trim what was persisted
+        start = time.perf_counter()
+        entries = await store.range()
+        await redis.xtrim(store.key, minid=next_stream_id(entries[-1][0]))
+        report(buffered, 'range() + xtrim flush',
+               time.perf_counter() - start)
+    finally:
+        await redis.delete(store.key, store.seen_key, list_key)
+        await redis.zrem(PENDING_FLUSH_KEY, store.pending_flush_member)
+
+
+def main():
+    sizes = parse_sizes(__doc__, [0, 1000, 10000])
+
+    setup_django()
+
+    for size in sizes:
+        asyncio.run(benchmark(size))
+
+
+if __name__ == '__main__':
+    main()
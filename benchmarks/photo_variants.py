@@ -0,0 +1,86 @@
+"""
+Measures the throughput of `make_variants` per core, generating the variants of camera-sized JPEG photos in a pool
+of 1 to `os.cpu_count()` processes like Celery worker processes do. \n
+Run from the project directory: python -m benchmarks.photo_variants [photos...]
+"""
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+from accounts.images import make_variants, remove_variants
+
+from benchmarks.common import parse_sizes, report
+
+# size in pixels of the generated photos, as taken by a 12 megapixel camera
+PHOTO_SIZE = (4000, 3000)
+
+
+def create_photos(directory, count):
+    """
+    Saves `count` JPEG photos of noise over a gradient, which compresses like a real photo, and returns their paths
+    """
+    gradient = Image.linear_gradient('L').resize(PHOTO_SIZE)
+
+    image = Image.merge('RGB', (gradient, Image.effect_noise(
+        PHOTO_SIZE, 64), gradient.transpose(Image.FLIP_LEFT_RIGHT)))
+
+    paths = []
+
+    for i in range(count):
+        path = os.path.join(directory, 'photo{0}.jpg'.format(i))
+        image.save(path, 'JPEG', quality=90)
+        paths.append(path)
+
+    return paths
+
+
+def get_pid(_):
+    return os.getpid()
+
+
+def worker_counts():
+    """
+    Gets the numbers of processes to benchmark, doubling up to the number of cores
+    """
+    counts = []
+    workers = 1
+
+    while workers < os.cpu_count():
+        counts.append(workers)
+        workers *= 2
+
+    return counts + [os.cpu_count()]
+
+
+def main():
+    sizes = parse_sizes(__doc__, [24])
+
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            paths = create_photos(directory, size)
+
+            for workers in worker_counts():
+                with ProcessPoolExecutor(workers) as executor:
+                    # start the processes before timing
+                    list(executor.map(get_pid, range(workers)))
+
+                    start = time.perf_counter()
+                    list(executor.map(make_variants, paths))
+                    seconds = time.perf_counter() - start
+
+                report(size,
+                       '{0} processes'.format(workers),
+                       seconds,
+                       unit='photos')
+                print('{0:>17} {1:.2f} photos/s per core'.format(
+                    '', size / seconds / workers))
+
+                for path in paths:
+                    remove_variants(path)
+
+
+if __name__ == '__main__':
+    main()
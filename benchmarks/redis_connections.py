@@ -0,0 +1,86 @@
+"""
+Load test opening 10, 100 and 1000 status websockets watching a `User` in one process and counting the
+connections opened to the Redis server by the consumers and the channel layer once they are open, to check that
+they are bounded by the pool sizes instead of growing with the number of sockets. \n
+Run from the project directory with Redis running: python -m benchmarks.redis_connections [sockets...]
+"""
+import asyncio
+
+from benchmarks.common import create_users, parse_sizes, setup, teardown
+
+# number of sockets connected at once
+CONNECT_BATCH_SIZE = 100
+
+
+async def open_sockets(count, username):
+    from channels.testing import WebsocketCommunicator
+    from django.contrib.auth.models import AnonymousUser
+
+    from accounts.consumers import StatusConsumer
+
+    sockets = []
+
+    for offset in range(0, count, CONNECT_BATCH_SIZE):
+        batch = []
+
+        for _ in range(min(CONNECT_BATCH_SIZE, count - offset)):
+            socket = WebsocketCommunicator(
+                StatusConsumer.as_asgi(),
+                '/ws/accounts/status/{0}/'.format(username))
+            socket.scope['url_route'] = {
+                'args': (),
+                'kwargs': {
+                    'user_name': username
+                }
+            }
+            socket.scope['user'] = AnonymousUser()
+            batch.append(socket)
+
+        results = await asyncio.gather(*(socket.connect()
+                                         for socket in batch))
+
+        if not all(connected for connected, _ in results):
+            raise RuntimeError('Could not open the sockets')
+
+        # wait for the status each socket is sent on connect
+        await asyncio.gather(*(socket.receive_from() for socket in batch))
+
+        sockets += batch
+
+    return sockets
+
+
+async def benchmark(count, username):
+    from DatingAppBackend import settings
+    from DatingAppBackend.redis_pool import get_redis
+
+    before = len(get_redis().client_list())
+
+    sockets = await open_sockets(count, username)
+
+    try:
+        opened = len(get_redis().client_list()) - before
+
+        print('{0:>8} sockets  {1:>6} Redis connections opened  '
+              '(REDIS_POOL_SIZE {2})'.format(count, opened,
+                                             settings.REDIS_POOL_SIZE))
+    finally:
+        await asyncio.gather(*(socket.disconnect() for socket in sockets))
+
+
+def main():
+    sizes = parse_sizes(__doc__, [10, 100, 1000])
+
+    old_config = setup()
+
+    try:
+        user = create_users(1)
+
+        for size in sizes:
+            asyncio.run(benchmark(size, user.username))
+    finally:
+        teardown(old_config)
+
+
+if __name__ == '__main__':
+    main()
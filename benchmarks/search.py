@@ -0,0 +1,89 @@
+"""
+Measures the latency of profile searches returning the first page of 100 users, the way `search_users` queries
+them, with 500k seeded users whose profiles use a vocabulary of common and rare words. \n
+Run from the project directory: python -m benchmarks.search [users...]
+"""
+import random
+import time
+
+from benchmarks.common import create_users, parse_sizes, report_latencies, setup, teardown
+
+# number of users per page
+LIMIT = 100
+
+# number of timed runs per query
+RUNS = 50
+
+# words of the profiles, earlier words being used more often
+VOCABULARY = [
+    'hiking', 'music', 'travel', 'cooking', 'movies', 'reading', 'running',
+    'yoga', 'photography', 'dancing', 'gaming', 'coffee', 'wine', 'dogs',
+    'cats', 'climbing', 'cycling', 'painting', 'theatre', 'football',
+    'surfing', 'skiing', 'chess', 'poetry', 'gardening', 'astronomy',
+    'pottery', 'sailing', 'birdwatching', 'calligraphy', 'fencing', 'origami'
+] + ['word{0}'.format(i) for i in range(2000)]
+
+# web search syntax queries from a frequent word to a rare one
+QUERIES = [
+    'hiking', 'music travel', 'yoga or climbing', 'photography -dogs',
+    'calligraphy', 'word1500'
+]
+
+
+def make_text(generator, count):
+    # Zipf-like choice of words
+    return ' '.join(
+        VOCABULARY[min(len(VOCABULARY) - 1, int(generator.paretovariate(1.0))
+                       - 1)] for _ in range(count))
+
+
+def main():
+    sizes = parse_sizes(__doc__, [500000])
+
+    old_config = setup()
+
+    try:
+        from django.db import connection
+
+        from accounts.models import User
+        from accounts.search import search_profiles, update_search_vector
+        from accounts.serializers import USER_VALUES
+
+        for size in sizes:
+            generator = random.Random(0)
+
+            create_users(size,
+                         interests=lambda i: make_text(generator, 4),
+                         looking_for=lambda i: make_text(generator, 2),
+                         introduction=lambda i: make_text(generator, 20))
+
+            update_search_vector(User.objects.all())
+
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+            queryset = User.objects.filter(
+                is_staff=False, is_active=True).exclude(username='user0')
+
+            for query in QUERIES:
+                matches = search_profiles(queryset, query).count()
+
+                latencies = []
+
+                for _ in range(RUNS):
+                    start = time.perf_counter()
+                    list(
+                        search_profiles(queryset,
+                                        query).values(*USER_VALUES)[:LIMIT])
+                    latencies.append(time.perf_counter() - start)
+
+                report_latencies(size,
+                                 '{0!r} ({1} matches)'.format(query, matches),
+                                 latencies,
+                                 unit='users')
+    finally:
+        teardown(old_config)
+
+
+if __name__ == '__main__':
+    main()
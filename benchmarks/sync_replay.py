@@ -0,0 +1,125 @@
+"""
+Measures the time to interactive of a chat socket on connect, i.e. until the buffered messages were read from
+`ChatMessageStore` and written to the socket, with 1k buffered messages. Compares the replay through a personal
+group of the channel layer the chat consumers used before, the replay with one `message` frame per message and
+the bulk replay with chunked `sync` frames (`?sync=bulk`). \n
+Run from the project directory with Redis running: python -m benchmarks.sync_replay [sizes...]
+"""
+import asyncio
+import time
+
+from DatingAppBackend.wire import FrameConsumerMixin
+
+from benchmarks.common import parse_sizes, report, setup_django
+from benchmarks.message_store import make_message
+
+
+class ReplaySocket(FrameConsumerMixin):
+    """
+    Socket of a consumer writing JSON text frames, counting the frames and bytes written to it
+    """
+    def __init__(self):
+        self.frames = 0
+        self.bytes = 0
+
+    async def send(self, text_data=None, bytes_data=None):
+        self.frames += 1
+        self.bytes += len(text_data.encode() if text_data else bytes_data)
+
+
+async def replay_through_group(store, socket):
+    from channels.layers import get_channel_layer
+
+    channel_layer = get_channel_layer()
+
+    channel = await channel_layer.new_channel()
+    group = 'benchmark_replay'
+
+    await channel_layer.group_add(group, channel)
+
+    try:
+        for _, message in await store.range():
+            # each message is published and received back by the consumer before being written
+            await channel_layer.group_send(group, {
+                'type': 'message',
+                'content': message
+            })
+
+            event = await channel_layer.receive(channel)
+
+            await socket.send_frame({
+                'type': 'message',
+                'chat_message': event['content']
+            })
+    finally:
+        await channel_layer.group_discard(group, channel)
+
+
+async def replay_per_message(store, socket):
+    for _, message in await store.range():
+        await socket.send_frame({'type': 'message', 'chat_message': message})
+
+
+async def replay_bulk(store, socket):
+    from chat.consumers import chunks
+
+    messages = [message for _, message in await store.range()]
+
+    for chunk in chunks(messages):
+        await socket.send_frame({'type': 'sync', 'messages': chunk})
+
+
+async def benchmark(size):
+    from DatingAppBackend import fast_json
+    from DatingAppBackend.redis_pool import get_async_redis
+
+    from chat.stores import PENDING_FLUSH_KEY, ChatMessageStore
+
+    redis = get_async_redis()
+
+    store = ChatMessageStore(redis, 'benchmark1', 'benchmark2')
+
+    await redis.delete(store.key, store.seen_key)
+
+    try:
+        pipe = redis.pipeline(transaction=False)
+
+        for i in range(size):
+            pipe.xadd(store.key, {'data': fast_json.dumps(make_message(i))})
+
+        await pipe.execute()
+
+        baseline = None
+
+        for name, replay in (('group_send per message',
+                              replay_through_group),
+                             ('message frame per message',
+                              replay_per_message), ('bulk sync frames',
+                                                    replay_bulk)):
+            socket = ReplaySocket()
+
+            start = time.perf_counter()
+            await replay(store, socket)
+            seconds = time.perf_counter() - start
+
+            report(size, name, seconds, baseline, unit='msgs')
+            print('{0:>17} frames {1:>12,} bytes'.format(
+                socket.frames, socket.bytes))
+
+            baseline = baseline or seconds
+    finally:
+        await redis.delete(store.key, store.seen_key)
+        await redis.zrem(PENDING_FLUSH_KEY, store.pending_flush_member)
+
+
+def main():
+    sizes = parse_sizes(__doc__, [1000])
+
+    setup_django()
+
+    for size in sizes:
+        asyncio.run(benchmark(size))
+
+
+if __name__ == '__main__':
+    main()
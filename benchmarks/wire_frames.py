@@ -0,0 +1,94 @@
+"""
+Compares the bytes per frame and the encode throughput of chat websocket frames written by `send_frame` as JSON
+text frames and as MessagePack binary frames with short field codes (`msgpack.v1`), along with the stdlib json
+frames the consumers sent before. \n
+Run from the project directory: python -m benchmarks.wire_frames [frames...]
+"""
+import asyncio
+import json
+
+from benchmarks.common import best_time, parse_sizes, report, setup_django
+from benchmarks.json_encoding import make_message_page, make_user_page
+
+
+def make_frames():
+    """
+    Makes the frames of a chat session by name: a chat message, a feed entry with the profiles of both `User`s,
+    a status and a bulk sync of 100 messages
+    """
+    messages = make_message_page(100)
+    first_user, second_user = make_user_page(2)
+
+    return {
+        'message': {
+            'type': 'message',
+            'chat_message': messages[0]
+        },
+        'feed': {
+            'type': 'feed',
+            'chat_room': {
+                'chatRoomName': 'user0_user1_chat',
+                'lastChatMessage': messages[0],
+                'firstUser': first_user,
+                'secondUser': second_user
+            },
+            'other_user': first_user['username']
+        },
+        'status': {
+            'type': 'status',
+            'status': 'online'
+        },
+        'sync': {
+            'type': 'sync',
+            'messages': messages
+        },
+    }
+
+
+def main():
+    counts = parse_sizes(__doc__, [10000])
+
+    setup_django()
+
+    from DatingAppBackend import wire
+
+    from benchmarks.sync_replay import ReplaySocket
+
+    if wire.msgpack is None:
+        raise SystemExit('msgpack is not installed')
+
+    for name, frame in make_frames().items():
+        print(name)
+
+        text_socket = ReplaySocket()
+
+        binary_socket = ReplaySocket()
+        binary_socket.binary_frames = True
+
+        for count in counts:
+            baseline = best_time(lambda: [json.dumps(frame)
+                                          for _ in range(count)])
+            report(count, 'json.dumps()', baseline, unit='frames')
+
+            async def send_frames(socket):
+                for _ in range(count):
+                    await socket.send_frame(frame)
+
+            for frames_name, socket in (('send_frame() JSON', text_socket),
+                                        ('send_frame() msgpack',
+                                         binary_socket)):
+                report(count,
+                       frames_name,
+                       best_time(lambda: asyncio.run(send_frames(socket))),
+                       baseline,
+                       unit='frames')
+
+        print('{0:>17} bytes per frame: json.dumps() {1}, JSON {2}, '
+              'msgpack {3}'.format(
+                  '', len(json.dumps(frame).encode()),
+                  text_socket.bytes // text_socket.frames,
+                  binary_socket.bytes // binary_socket.frames))
+
+
+if __name__ == '__main__':
+    main()
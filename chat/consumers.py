@@ -1,25 +1,51 @@
-import re
-from caches import Cache
+import asyncio
+from urllib.parse import parse_qs
 from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
-import json
 from django.contrib.auth.models import AnonymousUser
 
 from accounts.models import User
 
+from accounts.presence import Presence
+
 from DatingAppBackend import settings
 
+from DatingAppBackend.redis_pool import get_async_redis
+
+from DatingAppBackend.wire import FrameConsumerMixin
+
 from accounts.serializers import UserSerializer
 
+from .stores import (ChatFeedStore, ChatMessageStore, cache_profiles,
+                     get_profiles, set_chat_feed_entries)
+
 from .tasks import update_chat_db
 
 
-class ChatConsumer(AsyncWebsocketConsumer):
+def is_bulk_sync(scope):
+    """
+    Checks whether the client asked for the bulk replay mode with the `sync=bulk` query parameter
+    """
+    query_params = parse_qs(scope['query_string'].decode())
+    return query_params.get('sync', [''])[-1] == 'bulk'
+
+
+def chunks(items):
+    """
+    Splits the items replayed on connect into chunks of `SYNC_CHUNK_SIZE`
+    """
+    for index in range(0, len(items), settings.SYNC_CHUNK_SIZE):
+        yield items[index:index + settings.SYNC_CHUNK_SIZE]
+
+
+class ChatConsumer(FrameConsumerMixin, AsyncWebsocketConsumer):
     """
     Consumer to handle real time chat between Users
     """
     def __init__(self):
-        self.cache = Cache("redis://" + settings.REDIS_HOST)
+        self.redis = get_async_redis()
+        self.presence = Presence(self.redis)
+        self.presence_heartbeat = None
         super().__init__()
 
     # Get the valid User from database
@@ -32,170 +58,132 @@ class ChatConsumer(AsyncWebsocketConsumer):
         else:
             return AnonymousUser
 
-    # Sync chat with the database by running a Celery task
+    # Sync chat with the database by running a Celery task unless a sync is already queued, the task trims the persisted messages from the store
     async def sync_chat_with_database(self):
-        messages = await self.cache.get(self.chat_message_store)
-
-        if messages is not None and len(messages) > 0:
-            update_chat_db.delay(messages, self.channel_user.username,
+        if await self.message_store.claim_flush():
+            update_chat_db.delay(self.channel_user.username,
                                  self.other_user.username)
 
-        await self.cache.delete(self.chat_message_store)
-
     # Sync client with other devices if any
     async def sync_client(self):
-        messages = await self.cache.get(self.chat_message_store)
+        entries = await self.message_store.range()
 
         updates = False
 
-        if messages is not None:
-            for message in messages:
+        messages = [message for _, message in entries]
 
-                if 'recipient' in message and self.channel_user.username.lower() == message['recipient'].lower() \
-                    and 'seen' in message and message['seen'] == False:
-                    message['seen'] = True
+        for message in messages:
 
-                    updates = True
+            if 'recipient' in message and self.channel_user.username.lower() == message['recipient'].lower() \
+                and 'seen' in message and message['seen'] == False:
+                message['seen'] = True
 
-                await self.channel_layer.group_send(self.personal_group, {
-                    'type': 'message',
-                    'content': message
+                updates = True
+
+        if self.bulk_sync:
+            for chunk in chunks(messages):
+                await self.send_frame({
+                    'type': 'sync',
+                    'messages': chunk
                 })
+        else:
+            for message in messages:
+                await self.message({'content': message})
 
         if updates == True:
-            await self.cache.set(self.chat_message_store, messages)
+            await self.message_store.mark_seen(self.channel_user.username,
+                                               entries[-1][0])
 
-            other_user_chat_feed = await self.cache.get(
-                self.chat_feed_other_user_store)
+            entry = await self.chat_feed_channel_user_store.get(
+                self.other_user.username)
 
-            channel_user_chat_feed = await self.cache.get(
-                self.chat_feed_channel_user_store)
+            if entry is not None:
+                entry['lastChatMessage']['seen'] = True
 
-            other_user_chat_feed = {} if other_user_chat_feed is None else other_user_chat_feed
+                await set_chat_feed_entries(self.redis, [
+                    (self.other_user.username, self.channel_user.username,
+                     entry),
+                    (self.channel_user.username, self.other_user.username,
+                     entry),
+                ])
 
-            channel_user_chat_feed = {} if channel_user_chat_feed is None else channel_user_chat_feed
-
-            other_user_chat_feed[
-                self.channel_user.username]['lastChatMessage']['seen'] = True
-
-            channel_user_chat_feed[
-                self.other_user.username]['lastChatMessage']['seen'] = True
-
-            await self.channel_layer.group_send(
-                self.chat_feed_other_user, {
-                    'type':
-                    'update',
-                    'seen':
-                    other_user_chat_feed[self.channel_user.username]
-                    ['lastChatMessage']['recipient']
-                })
-
-            await self.channel_layer.group_send(
-                self.chat_feed_channel_user, {
-                    'type':
-                    'update',
-                    'seen':
-                    channel_user_chat_feed[self.other_user.username]
-                    ['lastChatMessage']['recipient']
-                })
-
-            await self.cache.set(self.chat_feed_other_user_store,
-                                 other_user_chat_feed)
+                await self.channel_layer.group_send(
+                    self.chat_feed_other_user, {
+                        'type': 'update',
+                        'seen': entry['lastChatMessage']['recipient']
+                    })
 
-            await self.cache.set(self.chat_feed_channel_user_store,
-                                 channel_user_chat_feed)
+                await self.channel_layer.group_send(
+                    self.chat_feed_channel_user, {
+                        'type': 'update',
+                        'seen': entry['lastChatMessage']['recipient']
+                    })
 
     # Add current client's device to the chat room
     async def add_device(self):
 
-        count = await self.cache.get(self.chat_channel_user_device_count)
+        # once the devices expire without being removed the chat room is told the User is not available
+        changes = [
+            (self.chat_channel_user_device_count, 1, {
+                'group': self.chat_room_name,
+                'event': {
+                    'type': 'availability',
+                    'user_not_available': self.channel_user.username
+                }
+            }),
+            (self.chat_feed_other_user_device_count, 1),
+            (self.chat_feed_channel_user_device_count, 1),
+        ]
+
+        count, _, _ = await self.presence.update(self.channel_name, changes)
 
-        if count is None:
+        if count == 1:
             await self.channel_layer.group_send(
                 self.chat_room_name, {
                     'type': 'availability',
                     'user_available': self.channel_user.username
                 })
 
-            await self.cache.set(self.chat_channel_user_device_count, 1)
-        else:
-            await self.cache.set(self.chat_channel_user_device_count,
-                                 count + 1)
-
-        other_user_chat_feed_device_count = await self.cache.get(
-            self.chat_feed_other_user_device_count)
-
-        if other_user_chat_feed_device_count is None:
-            await self.cache.set(self.chat_feed_other_user_device_count, 1)
-        else:
-            await self.cache.set(self.chat_feed_other_user_device_count,
-                                 other_user_chat_feed_device_count + 1)
-
-        channel_user_chat_feed_device_count = await self.cache.get(
-            self.chat_feed_channel_user_device_count)
-
-        if channel_user_chat_feed_device_count is None:
-            await self.cache.set(self.chat_feed_channel_user_device_count, 1)
-        else:
-            await self.cache.set(self.chat_feed_channel_user_device_count,
-                                 channel_user_chat_feed_device_count + 1)
+        self.presence_heartbeat = asyncio.ensure_future(
+            self.presence.keep_alive(self.channel_name, changes))
 
     # Remove current client's device from the chat room and sync the chat with database if no user belonging to the chat room is online
     async def remove_device(self):
 
-        count = await self.cache.get(self.chat_channel_user_device_count)
-
-        if count is not None:
-            if count <= 1:
-                await self.cache.delete(self.chat_channel_user_device_count)
-
-                await self.channel_layer.group_send(
-                    self.chat_room_name, {
-                        'type': 'availability',
-                        'user_not_available': self.channel_user.username
-                    })
-
-                other_count = await self.cache.get(
-                    self.chat_other_user_device_count)
-
-                if other_count is None or other_count < 1:
-                    await self.sync_chat_with_database()
+        if self.presence_heartbeat is not None:
+            self.presence_heartbeat.cancel()
 
-            else:
-                await self.cache.set(self.chat_channel_user_device_count,
-                                     count - 1)
+        counts = await self.presence.update(self.channel_name, [
+            (self.chat_channel_user_device_count, -1),
+            (self.chat_other_user_device_count, 0),
+            (self.chat_feed_other_user_device_count, -1),
+            (self.chat_feed_channel_user_device_count, -1),
+        ])
 
-        other_user_chat_feed_device_count = await self.cache.get(
-            self.chat_feed_other_user_device_count)
+        count, other_count, other_feed_count, channel_feed_count = counts
 
-        if other_user_chat_feed_device_count is not None:
-
-            if other_user_chat_feed_device_count <= 1:
-                await self.cache.delete(self.chat_feed_other_user_device_count)
-                await self.cache.delete(self.chat_feed_other_user_store)
-            else:
-                await self.cache.set(self.chat_feed_other_user_device_count,
-                                     other_user_chat_feed_device_count - 1)
+        if count == 0:
+            await self.channel_layer.group_send(
+                self.chat_room_name, {
+                    'type': 'availability',
+                    'user_not_available': self.channel_user.username
+                })
 
-        channel_user_chat_feed_device_count = await self.cache.get(
-            self.chat_feed_channel_user_device_count)
+            if other_count == 0:
+                await self.sync_chat_with_database()
 
-        if channel_user_chat_feed_device_count is not None:
+        if other_feed_count == 0:
+            await self.chat_feed_other_user_store.delete()
 
-            if channel_user_chat_feed_device_count <= 1:
-                await self.cache.delete(
-                    self.chat_feed_channel_user_device_count)
-                await self.cache.delete(self.chat_feed_channel_user_store)
-            else:
-                await self.cache.set(self.chat_feed_channel_user_device_count,
-                                     channel_user_chat_feed_device_count - 1)
+        if channel_feed_count == 0:
+            await self.chat_feed_channel_user_store.delete()
 
     # Send message to group and update message store on receiving message from client
     async def receive(self, text_data=None, bytes_data=None):
 
-        if text_data is not None:
+        data_json = self.decode_frame(text_data, bytes_data)
 
-            data_json = json.loads(text_data)
+        if data_json is not None:
 
             try:
 
@@ -208,9 +196,10 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
                 content['sender'] = self.channel_user.username
 
-                count = await self.cache.get(self.chat_other_user_device_count)
+                count = await self.presence.count(
+                    self.chat_other_user_device_count)
 
-                if count is not None and count > 0:
+                if count > 0:
                     content['seen'] = True
                 else:
                     content['seen'] = False
@@ -223,117 +212,85 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 'content': content
             })
 
-            messages = await self.cache.get(self.chat_message_store)
-
-            if messages is None:
-                messages = []
-
-            messages.append(content)
-
-            await self.cache.set(self.chat_message_store, messages)
+            _, length = await self.message_store.append(content)
 
-            user1 = self.channel_user
-            user2 = self.other_user
+            if length >= settings.CHAT_FLUSH_MAX_MESSAGES:
+                await self.sync_chat_with_database()
 
-            if user1.username > user2.username:
-                user1, user2 = user2, user1
+            user1, user2 = sorted(
+                (self.channel_user.username, self.other_user.username))
 
-            chat_room_name = user1.username + '_' + user2.username + '_chat'
+            entry = {
+                'chatRoomName': self.chat_room_name,
+                'lastChatMessage': content,
+                'firstUser': user1,
+                'secondUser': user2
+            }
 
-            other_user_chat_feed = await self.cache.get(
-                self.chat_feed_other_user_store)
-            channel_user_chat_feed = await self.cache.get(
-                self.chat_feed_channel_user_store)
+            await set_chat_feed_entries(self.redis, [
+                (self.other_user.username, self.channel_user.username, entry),
+                (self.channel_user.username, self.other_user.username, entry),
+            ])
 
-            other_user_chat_feed = {} if other_user_chat_feed is None else other_user_chat_feed
-
-            channel_user_chat_feed = {} if channel_user_chat_feed is None else channel_user_chat_feed
-
-            if self.channel_user.username in other_user_chat_feed and self.other_user.username in channel_user_chat_feed:
-                other_user_chat_feed[
-                    self.channel_user.username]['lastChatMessage'] = content
-
-                channel_user_chat_feed[
-                    self.other_user.username]['lastChatMessage'] = content
-
-            else:
-                other_user_chat_feed[self.channel_user.username] = {
-                    'chatRoomName': chat_room_name,
-                    'lastChatMessage': content,
-                    'firstUser': UserSerializer(instance=user1).data,
-                    'secondUser': UserSerializer(instance=user2).data
-                }
-
-                channel_user_chat_feed[self.other_user.username] = {
-                    'chatRoomName': chat_room_name,
-                    'lastChatMessage': content,
-                    'firstUser': UserSerializer(instance=user1).data,
-                    'secondUser': UserSerializer(instance=user2).data
-                }
+            chat_room = dict(entry,
+                             firstUser=self.profiles[user1],
+                             secondUser=self.profiles[user2])
 
             await self.channel_layer.group_send(
                 self.chat_feed_other_user, {
                     'type': 'feed',
-                    'chat_room':
-                    other_user_chat_feed[self.channel_user.username],
+                    'chat_room': chat_room,
                     'other_user': self.channel_user.username
                 })
 
             await self.channel_layer.group_send(
                 self.chat_feed_channel_user, {
                     'type': 'feed',
-                    'chat_room':
-                    channel_user_chat_feed[self.other_user.username],
+                    'chat_room': chat_room,
                     'other_user': self.other_user.username
                 })
 
-            await self.cache.set(self.chat_feed_other_user_store,
-                                 other_user_chat_feed)
-
-            await self.cache.set(self.chat_feed_channel_user_store,
-                                 channel_user_chat_feed)
-
     async def message(self, event):
         content = event['content']
 
-        await self.send(text_data=json.dumps({
+        await self.send_frame({
             'type': 'message',
             'chat_message': content
-        }))
+        })
 
     async def availability(self, event):
 
         if 'user_not_available' in event:
             user = event['user_not_available']
 
-            await self.send(text_data=json.dumps({
+            await self.send_frame({
                 'type': 'availability',
                 'user_not_available': user
-            }))
+            })
 
         if 'user_available' in event:
             user = event['user_available']
 
-            await self.send(text_data=json.dumps({
+            await self.send_frame({
                 'type': 'availability',
                 'user_available': user
-            }))
+            })
 
     async def feed(self, event):
         chat_room = event['chat_room']
 
         other_user = event['other_user']
 
-        await self.send(text_data=json.dumps({
+        await self.send_frame({
             'type': 'feed',
             'chat_room': chat_room,
             'other_user': other_user
-        }))
+        })
 
     async def update(self, event):
         seen = event['seen']
 
-        await self.send(text_data=json.dumps({'type': 'update', 'seen': seen}))
+        await self.send_frame({'type': 'update', 'seen': seen})
 
     # Try connecting the client to the chat room
     async def connect(self):
@@ -342,10 +299,8 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
         user_name_2 = self.scope['url_route']['kwargs']['user_name_2'].lower()
 
-        # Group specific for the channel to send synced messages or connection result back to the client
-        self.personal_group = re.sub(r'[^0-9a-zA-Z]+', '-',
-                                     self.channel_name) + "_personal_group"
-
+        # Whether the client wants the buffered messages in bulk `sync` frames
+        self.bulk_sync = is_bulk_sync(self.scope)
 
         if self.scope['user'] != AnonymousUser and \
             self.scope['user'].username.lower() == user_name_1 or self.scope['user'].username.lower() == user_name_2:
@@ -361,10 +316,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 await self.close()
                 return
 
-            await self.channel_layer.group_add(self.personal_group,
-                                               self.channel_name)
-
-            await self.accept()
+            await self.accept_frames()
 
             self.chat_room_name = min(self.channel_user.username,
                                       self.other_user.username) + '_' + max(
@@ -375,11 +327,14 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
             self.chat_other_user_device_count = self.chat_room_name + '_' + self.other_user.username + '_device_count'
 
-            self.chat_message_store = self.chat_room_name + '_message_store'
+            self.message_store = ChatMessageStore(self.redis,
+                                                  self.channel_user.username,
+                                                  self.other_user.username)
 
             self.chat_feed_other_user = self.other_user.username + '_chat_feed'
 
-            self.chat_feed_other_user_store = self.other_user.username + '_chat_feed_store'
+            self.chat_feed_other_user_store = ChatFeedStore(
+                self.redis, self.other_user.username)
 
             self.chat_feed_other_user_device_count = self.other_user.username + '_chat_feed_device_count'
 
@@ -387,9 +342,16 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
             self.chat_feed_channel_user = self.channel_user.username + '_chat_feed'
 
-            self.chat_feed_channel_user_store = self.channel_user.username + '_chat_feed_store'
+            self.chat_feed_channel_user_store = ChatFeedStore(
+                self.redis, self.channel_user.username)
+
+            # profiles of the chat room's users embedded in the feed events
+            self.profiles = {
+                user.username: UserSerializer(instance=user).data
+                for user in (self.channel_user, self.other_user)
+            }
 
-            await self.cache.connect()
+            await cache_profiles(self.redis, self.profiles)
 
             await self.sync_client()
 
@@ -407,15 +369,10 @@ class ChatConsumer(AsyncWebsocketConsumer):
             await self.close()
             return
 
-        await self.channel_layer.group_discard(self.personal_group,
-                                               self.channel_name)
-
     # Disconnect the client from the chat room and sync the chat if it's the last device
     async def disconnect(self, close_code):
         await self.remove_device()
 
-        await self.cache.disconnect()
-
         await self.channel_layer.group_discard(self.chat_room_name,
                                                self.channel_name)
 
@@ -426,75 +383,106 @@ class ChatConsumer(AsyncWebsocketConsumer):
                                                self.channel_name)
 
 
-class ChatFeedConsumer(AsyncWebsocketConsumer):
+class ChatFeedConsumer(FrameConsumerMixin, AsyncWebsocketConsumer):
     """
     Consumer to handle chat feeds
     """
     def __init__(self):
-        self.cache = Cache("redis://" + settings.REDIS_HOST)
+        self.redis = get_async_redis()
         super().__init__()
 
-    async def sync_client(self):
-        feeds = await self.cache.get(self.chat_feed_channel_user_store)
+    # Get the serialized profiles of the Users from the cache, loading the missing ones from database
+    async def get_profiles(self, usernames):
+        profiles = await get_profiles(self.redis, usernames)
 
-        if feeds is not None:
-            for feed in feeds:
-                await self.channel_layer.group_send(self.personal_group, {
-                    'type': 'feed',
-                    'chat_room': feeds[feed],
-                    'other_user': feed
+        missing = [
+            username for username in usernames if username not in profiles
+        ]
+
+        if len(missing) > 0:
+            loaded = await self.load_profiles(missing)
+
+            await cache_profiles(self.redis, loaded)
+
+            profiles.update(loaded)
+
+        return profiles
+
+    @database_sync_to_async
+    def load_profiles(self, usernames):
+        return {
+            user.username: UserSerializer(instance=user).data
+            for user in User.objects.filter(username__in=usernames)
+        }
+
+    async def sync_client(self):
+        feeds = await self.chat_feed_channel_user_store.get_all()
+
+        profiles = await self.get_profiles({
+            username
+            for entry in feeds.values()
+            for username in (entry['firstUser'], entry['secondUser'])
+        })
+
+        chat_rooms = [{
+            'chat_room':
+            dict(feeds[feed],
+                 firstUser=profiles.get(feeds[feed]['firstUser']),
+                 secondUser=profiles.get(feeds[feed]['secondUser'])),
+            'other_user':
+            feed
+        } for feed in feeds]
+
+        if self.bulk_sync:
+            for chunk in chunks(chat_rooms):
+                await self.send_frame({
+                    'type': 'sync',
+                    'chat_rooms': chunk
                 })
+        else:
+            for chat_room in chat_rooms:
+                await self.feed(chat_room)
 
     async def feed(self, event):
         chat_room = event['chat_room']
 
         other_user = event['other_user']
 
-        await self.send(text_data=json.dumps({
+        await self.send_frame({
             'type': 'feed',
             'chat_room': chat_room,
             'other_user': other_user
-        }))
+        })
 
     async def update(self, event):
         seen = event['seen']
 
-        await self.send(text_data=json.dumps({'type': 'update', 'seen': seen}))
+        await self.send_frame({'type': 'update', 'seen': seen})
 
     async def connect(self):
 
-        # Group specific for the channel to send synced messages or connection result back to the client
-        self.personal_group = re.sub(r'[^0-9a-zA-Z]+', '-',
-                                     self.channel_name) + "_personal_group"
+        # Whether the client wants the chat feed in bulk `sync` frames
+        self.bulk_sync = is_bulk_sync(self.scope)
 
         if self.scope['user'] == AnonymousUser:
             await self.close()
             return
 
-        await self.channel_layer.group_add(self.personal_group,
-                                           self.channel_name)
-
-        await self.accept()
+        await self.accept_frames()
 
         self.channel_user = self.scope['user']
 
-        self.chat_feed_channel_user_store = self.channel_user.username + '_chat_feed_store'
+        self.chat_feed_channel_user_store = ChatFeedStore(
+            self.redis, self.channel_user.username)
 
         self.chat_feed_channel_user = self.channel_user.username + '_chat_feed'
 
-        await self.cache.connect()
-
         await self.sync_client()
 
-        await self.channel_layer.group_discard(self.personal_group,
-                                               self.channel_name)
-
         await self.channel_layer.group_add(self.chat_feed_channel_user,
                                            self.channel_name)
 
     async def disconnect(self, code):
 
-        await self.cache.disconnect()
-
         await self.channel_layer.group_discard(self.chat_feed_channel_user,
                                                self.channel_name)
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.9 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatroom',
+            name='last_flushed_id',
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+    ]
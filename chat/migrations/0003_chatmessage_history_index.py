@@ -0,0 +1,18 @@
+# Generated by Django 3.2.9 on 2026-10-18 10:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0002_chatroom_last_flushed_id'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['chat_room', 'created_at', 'id'],
+                               name='chat_message_history_idx'),
+        ),
+    ]
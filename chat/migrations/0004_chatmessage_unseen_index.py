@@ -0,0 +1,19 @@
+# Generated by Django 3.2.9 on 2026-10-18 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0003_chatmessage_history_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(condition=models.Q(('seen', False)),
+                               fields=['chat_room', 'recipient'],
+                               name='chat_message_unseen_idx'),
+        ),
+    ]
@@ -44,6 +44,9 @@ class ChatRoom(models.Model):
                                           on_delete=models.CASCADE,
                                           null=True)
 
+    # entry ID of the last buffered message synced with the database
+    last_flushed_id = models.CharField(max_length=50, null=True, blank=True)
+
 
 class ChatMessage(models.Model):
     """
@@ -82,3 +85,14 @@ class ChatMessage(models.Model):
                                   related_name='chat_room',
                                   null=False,
                                   on_delete=models.CASCADE)
+
+    class Meta:
+        indexes = [
+            # keyset pagination of the chat history
+            models.Index(fields=['chat_room', 'created_at', 'id'],
+                         name='chat_message_history_idx'),
+            # unseen messages of a chat room
+            models.Index(fields=['chat_room', 'recipient'],
+                         name='chat_message_unseen_idx',
+                         condition=models.Q(seen=False)),
+        ]
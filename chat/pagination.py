@@ -1,5 +1,10 @@
+import base64
+import binascii
+from datetime import datetime
+from django.db.models import Q
 from rest_framework import pagination
 from rest_framework import serializers
+from rest_framework.response import Response
 
 
 class ChatMessagePagination(pagination.LimitOffsetPagination):
@@ -72,4 +77,159 @@ class ChatMessagePagination(pagination.LimitOffsetPagination):
             request.GET['limit'] = str(count)
 
         return super(self.__class__,
-                     self).paginate_queryset(queryset, request, view)
\ No newline at end of file
+                     self).paginate_queryset(queryset, request, view)
+
+
+class ChatMessageCursorPagination(pagination.BasePagination):
+    """
+    Keyset Paginator for `ChatMessages`s rows (from `values()`) ordered from newest to oldest. \n Requires client to provide `before` or `after` cursor and `limit` parameters.
+    \n An empty `before` cursor gets the newest messages.
+    """
+
+    default_limit = 100
+    max_limit = 1000
+    min_limit = 1
+
+    @staticmethod
+    def encode_cursor(chat_message):
+        """
+        Encodes the (created_at, id) key of a `ChatMessage` row (from `values()`) into an opaque cursor
+        """
+        key = chat_message['created_at'].isoformat() + '|' + str(
+            chat_message['id'])
+        return base64.urlsafe_b64encode(key.encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor, param):
+        """
+        Decodes an opaque cursor into the (created_at, id) key of a `ChatMessage`
+        """
+        try:
+            created_at, id = base64.urlsafe_b64decode(
+                cursor.encode()).decode().split('|')
+            return datetime.fromisoformat(created_at), int(id)
+        except (ValueError, UnicodeError, binascii.Error):
+            raise serializers.ValidationError(
+                {param: ["Invalid cursor provided"]})
+
+    def paginate_queryset(self, queryset, request, view=None):
+
+        limit = request.query_params.get('limit')
+        before = request.query_params.get('before')
+        after = request.query_params.get('after')
+
+        self.limit = self.default_limit
+
+        if limit and limit.strip().isnumeric():
+
+            self.limit = int(limit.strip())
+
+            if self.limit > self.max_limit:
+                raise serializers.ValidationError({
+                    "limit": [
+                        "Limit should be less than or equal to {0}".format(
+                            self.max_limit)
+                    ]
+                })
+
+            elif self.limit < self.min_limit:
+                raise serializers.ValidationError({
+                    "limit": [
+                        "Limit should be greater than or equal to {0}".format(
+                            self.min_limit)
+                    ]
+                })
+
+        if after:
+            created_at, id = self.decode_cursor(after.strip(), 'after')
+
+            queryset = queryset.filter(
+                Q(created_at__gt=created_at)
+                | Q(created_at=created_at, id__gt=id),
+                created_at__gte=created_at).order_by('created_at', 'id')
+
+            self.page = list(queryset[:self.limit])[::-1]
+
+        else:
+            queryset = queryset.order_by('-created_at', '-id')
+
+            if before:
+                created_at, id = self.decode_cursor(before.strip(), 'before')
+
+                queryset = queryset.filter(
+                    Q(created_at__lt=created_at)
+                    | Q(created_at=created_at, id__lt=id),
+                    created_at__lte=created_at)
+
+            self.page = list(queryset[:self.limit])
+
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'results':
+            data,
+            'before':
+            self.encode_cursor(self.page[-1]) if len(self.page) > 0 else None,
+            'after':
+            self.encode_cursor(self.page[0]) if len(self.page) > 0 else None
+        })
+
+
+class ChatRoomPagination(pagination.LimitOffsetPagination):
+    """
+    Custom Limit Offset Paginator for `ChatRoom`s. \n Requires client to provide `limit` and `offset` parameters.
+    """
+
+    default_limit = 100
+    max_limit = 1000
+    min_limit = 1
+    min_offset = 0
+    max_offset = 1000000
+
+    def paginate_queryset(self, queryset, request, view=None):
+
+        limit = request.query_params.get('limit')
+        offset = request.query_params.get('offset')
+
+        if limit and limit.strip().isnumeric():
+
+            limit = int(limit.strip())
+
+            if limit > self.max_limit:
+                raise serializers.ValidationError({
+                    "limit": [
+                        "Limit should be less than or equal to {0}".format(
+                            self.max_limit)
+                    ]
+                })
+
+            elif limit < self.min_limit:
+                raise serializers.ValidationError({
+                    "limit": [
+                        "Limit should be greater than or equal to {0}".format(
+                            self.min_limit)
+                    ]
+                })
+
+        if offset and offset.strip().isnumeric():
+
+            offset = int(offset.strip())
+
+            if offset > self.max_offset:
+                raise serializers.ValidationError({
+                    "offset": [
+                        "Offset should be less than or equal to {0}".format(
+                            self.max_offset)
+                    ]
+                })
+
+            elif offset < self.min_offset:
+                raise serializers.ValidationError({
+                    "offset": [
+                        "Offset should be greater than or equal to {0}".format(
+                            self.min_offset)
+                    ]
+                })
+
+        return super().paginate_queryset(queryset, request, view)
@@ -21,6 +21,25 @@ class ChatMessageSerializer(serializers.ModelSerializer):
                   'content')
 
 
+# fields of `ChatMessage` read by `serialize_chat_message_values`
+CHAT_MESSAGE_VALUES = ('id', 'message_type', 'sender__username',
+                       'recipient__username', 'created_at', 'seen', 'content')
+
+
+def serialize_chat_message_values(rows):
+    """
+    Fast read-only equivalent of `ChatMessageSerializer(many=True).data` for rows of `ChatMessage.objects.values(*CHAT_MESSAGE_VALUES)`
+    """
+    return [{
+        'messageType': row['message_type'],
+        'sender': row['sender__username'],
+        'recipient': row['recipient__username'],
+        'createdAt': str(row['created_at']),
+        'seen': row['seen'],
+        'content': row['content']
+    } for row in rows]
+
+
 class ChatRoomSerializer(serializers.ModelSerializer):
     """
     Serializer for handling `ChatRoom`
@@ -0,0 +1,256 @@
+import time
+
+from DatingAppBackend import fast_json, settings
+
+# sorted set of the chat rooms having buffered messages scored by the time their oldest unflushed message was buffered
+PENDING_FLUSH_KEY = 'chat_rooms_pending_flush'
+
+
+# Lua script finishing the flush of the chat room with the message store KEYS[1] and flush flag KEYS[3].
+# The chat room ARGV[1] stays pending in the sorted set KEYS[2], scored by the time its oldest remaining message
+# was buffered, if messages were buffered while flushing. Checking and removing at once keeps messages buffered
+# in between from being dropped from the sorted set.
+RELEASE_FLUSH = """
+local first = redis.call('XRANGE', KEYS[1], '-', '+', 'COUNT', 1)
+if #first > 0 then
+    local milliseconds = string.match(first[1][1], '^(%d+)')
+    redis.call('ZADD', KEYS[2], tonumber(milliseconds) / 1000, ARGV[1])
+else
+    redis.call('ZREM', KEYS[2], ARGV[1])
+end
+redis.call('DEL', KEYS[3])
+return #first
+"""
+
+
+def get_chat_room_name(username1, username2):
+    """
+    Gets the name of the chat room of two `User`s
+    """
+    return min(username1, username2) + '_' + max(username1,
+                                                 username2) + '_chat'
+
+
+def message_store_key(chat_room_name):
+    """
+    Gets the Redis key of the message store of a chat room
+    """
+    return chat_room_name + '_message_store'
+
+
+def seen_key(chat_room_name):
+    """
+    Gets the Redis key of the last entry IDs seen by the recipients of a chat room
+    """
+    return chat_room_name + '_seen'
+
+
+def flush_pending_key(chat_room_name):
+    """
+    Gets the Redis key set while a flush of a chat room is queued or running
+    """
+    return chat_room_name + '_flush_pending'
+
+
+def pending_flush_member(username1, username2):
+    """
+    Gets the member of a chat room in the sorted set of chat rooms pending a flush
+    """
+    return fast_json.dumps(
+        [min(username1, username2),
+         max(username1, username2)])
+
+
+def parse_stream_id(stream_id):
+    """
+    Splits a Redis Stream entry ID into a comparable (milliseconds, sequence) tuple
+    """
+    milliseconds, sequence = stream_id.split('-')
+    return int(milliseconds), int(sequence)
+
+
+def next_stream_id(stream_id):
+    """
+    Gets the smallest Redis Stream entry ID greater than the given one
+    """
+    milliseconds, sequence = parse_stream_id(stream_id)
+    return '{0}-{1}'.format(milliseconds, sequence + 1)
+
+
+def decode_entries(entries, seen_marks):
+    """
+    Decodes Redis Stream entries into (entry ID, message) pairs applying the entry IDs seen by the recipients
+    """
+    seen_marks = {
+        username: parse_stream_id(entry_id)
+        for username, entry_id in seen_marks.items()
+    }
+
+    result = []
+
+    for entry_id, fields in entries:
+        message = fast_json.loads(fields['data'])
+
+        recipient = message.get('recipient')
+
+        if recipient is not None and recipient.lower() in seen_marks and \
+            parse_stream_id(entry_id) <= seen_marks[recipient.lower()]:
+            message['seen'] = True
+
+        result.append((entry_id, message))
+
+    return result
+
+
+class ChatMessageStore:
+    """
+    Append-only buffer of the chat messages of a chat room backed by a Redis Stream. \n
+    Messages are never rewritten once appended, the `seen` state of the messages is kept as
+    the last entry ID seen by each recipient and applied while reading.
+    """
+    def __init__(self, redis, username1, username2):
+        self.redis = redis
+        self.chat_room_name = get_chat_room_name(username1, username2)
+        self.key = message_store_key(self.chat_room_name)
+        self.seen_key = seen_key(self.chat_room_name)
+        self.flush_pending_key = flush_pending_key(self.chat_room_name)
+        self.pending_flush_member = pending_flush_member(username1, username2)
+
+    async def append(self, message):
+        """
+        Appends a message to the store and returns its entry ID along with the number of buffered messages
+        """
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.xadd(self.key, {'data': fast_json.dumps(message)})
+        pipe.xlen(self.key)
+        pipe.zadd(PENDING_FLUSH_KEY, {self.pending_flush_member: time.time()},
+                  nx=True)
+        entry_id, length, _ = await pipe.execute()
+
+        return entry_id, length
+
+    async def range(self, start='-', end='+', count=None):
+        """
+        Gets the buffered messages between the entry IDs `start` and `end` as (entry ID, message) pairs
+        """
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.xrange(self.key, min=start, max=end, count=count)
+        pipe.hgetall(self.seen_key)
+        entries, seen_marks = await pipe.execute()
+
+        return decode_entries(entries, seen_marks)
+
+    async def length(self):
+        """
+        Gets the number of buffered messages
+        """
+        return await self.redis.xlen(self.key)
+
+    async def mark_seen(self, username, entry_id):
+        """
+        Marks the messages sent to `username` up to the entry ID as seen
+        """
+        await self.redis.hset(self.seen_key, username.lower(), entry_id)
+
+    async def claim_flush(self):
+        """
+        Claims the flush of the chat room, returns False if a flush is already queued or running
+        """
+        return bool(await self.redis.set(self.flush_pending_key,
+                                         1,
+                                         nx=True,
+                                         ex=settings.CHAT_FLUSH_TIMEOUT))
+
+
+def chat_feed_key(username):
+    """
+    Gets the Redis key of the chat feed hash of a `User`
+    """
+    return username + '_chat_feed_store'
+
+
+def profile_key(username):
+    """
+    Gets the Redis key of the serialized profile of a `User`
+    """
+    return username + '_profile'
+
+
+async def set_chat_feed_entries(redis, entries):
+    """
+    Sets the chat feed entries given as (username, other username, entry) in one round trip
+    """
+    pipe = redis.pipeline(transaction=False)
+
+    for username, other_username, entry in entries:
+        pipe.hset(chat_feed_key(username), other_username,
+                  fast_json.dumps(entry))
+
+    await pipe.execute()
+
+
+async def get_profiles(redis, usernames):
+    """
+    Gets the cached serialized profiles of the `User`s, profiles not cached are left out
+    """
+    usernames = list(usernames)
+
+    if len(usernames) == 0:
+        return {}
+
+    profiles = await redis.mget([profile_key(username) for username in usernames])
+
+    return {
+        username: fast_json.loads(profile)
+        for username, profile in zip(usernames, profiles)
+        if profile is not None
+    }
+
+
+async def cache_profiles(redis, profiles):
+    """
+    Caches the serialized profiles of the `User`s for `PROFILE_CACHE_TTL` seconds
+    """
+    pipe = redis.pipeline(transaction=False)
+
+    for username, profile in profiles.items():
+        pipe.set(profile_key(username),
+                 fast_json.dumps(profile),
+                 ex=settings.PROFILE_CACHE_TTL)
+
+    await pipe.execute()
+
+
+class ChatFeedStore:
+    """
+    Chat feed of a `User` buffered in Redis as a hash with a field per other `User`. \n
+    Entries hold the usernames of the chat room's `User`s, their serialized profiles are cached separately.
+    """
+    def __init__(self, redis, username):
+        self.redis = redis
+        self.username = username
+        self.key = chat_feed_key(username)
+
+    async def get(self, other_username):
+        """
+        Gets the entry of the chat room with the other `User`
+        """
+        entry = await self.redis.hget(self.key, other_username)
+        return None if entry is None else fast_json.loads(entry)
+
+    async def get_all(self):
+        """
+        Gets the entries of the chat feed by the other `User`
+        """
+        entries = await self.redis.hgetall(self.key)
+
+        return {
+            other_username: fast_json.loads(entry)
+            for other_username, entry in entries.items()
+        }
+
+    async def delete(self):
+        """
+        Removes the chat feed
+        """
+        await self.redis.delete(self.key)
@@ -1,98 +1,170 @@
+import logging
+import time
 from DatingAppBackend.celery import app
+from DatingAppBackend import fast_json, settings
+from DatingAppBackend.redis_pool import get_redis
 from dateutil import parser
+from django.db import transaction
 
 from accounts.models import User
 
 from chat.models import ChatMessage, ChatRoom, MESSAGE_TYPE
 
+from chat.stores import (PENDING_FLUSH_KEY, RELEASE_FLUSH, decode_entries,
+                         flush_pending_key, get_chat_room_name,
+                         message_store_key, next_stream_id,
+                         pending_flush_member, seen_key)
 
-# Update db by running the celery task
-@app.task
-def update_chat_db(messages, username1, username2):
+logger = logging.getLogger(__name__)
 
-    user1 = User.objects.filter(username=username1).first()
+redis = get_redis()
 
-    user2 = User.objects.filter(username=username2).first()
+release_flush_script = redis.register_script(RELEASE_FLUSH)
 
-    if user1 is None or user2 is None:
-        return
+# allowed message types in lower case
+MESSAGE_TYPES = {message_type.lower() for message_type, _ in MESSAGE_TYPE}
 
-    if user1.username > user2.username:
-        user1, user2 = user2, user1
 
-    chat_room_name = user1.username + '_' + user2.username + '_chat'
+def parse_created_at(created_at):
+    """
+    Parses the creation time of a message, trying the ISO 8601 fast path first
+    """
+    try:
+        return parser.isoparse(created_at)
+    except ValueError:
+        return parser.parse(created_at)
 
-    chat_room = ChatRoom.objects.filter(chat_room_name=chat_room_name).first()
 
-    if chat_room is None:
-        chat_room = ChatRoom(chat_room_name=chat_room_name,
-                             user1=user1,
-                             user2=user2)
-        chat_room.save()
+def build_chat_messages(messages, chat_room, user1, user2):
+    """
+    Validates the buffered messages in one pass and builds the `ChatMessage`s to be inserted. \n
+    Invalid messages are skipped.
+    """
+    users = {user1.username.lower(): user1, user2.username.lower(): user2}
 
-    last_chat_message = None
+    chat_messages = []
 
     for message in messages:
-        message_type = None
-
-        sender = None
-        recipient = None
+        message_type = message.get('messageType')
+        sender = message.get('sender')
+        recipient = message.get('recipient')
+        content = message.get('content')
 
-        created_at = None
+        if type(message_type) != str or \
+            message_type.lower() not in MESSAGE_TYPES:
+            continue
 
-        seen = None
+        if type(sender) != str or type(recipient) != str:
+            continue
 
-        content = None
+        if type(content) != str or len(content.strip()) == 0:
+            continue
 
         try:
-            if 'messageType' in message and type(
-                    message['messageType']) == str:
-                message_type = message['messageType'].lower()
+            created_at = parse_created_at(message['createdAt'])
+        except (KeyError, TypeError, ValueError, OverflowError) as error:
+            logger.warning('Skipped chat message with invalid createdAt: %s',
+                           error)
+            continue
 
-            if 'sender' in message and type(message['sender']) == str:
-                sender = user1 if user1.username.lower(
-                ) == message['sender'].lower() else user2
+        chat_messages.append(
+            ChatMessage(message_type=message_type.lower(),
+                        sender=users.get(sender.lower(), user2),
+                        recipient=users.get(recipient.lower(), user2),
+                        created_at=created_at,
+                        seen=True if message.get('seen') else False,
+                        content=content,
+                        chat_room=chat_room))
 
-            if 'recipient' in message and type(message['recipient']) == str:
-                recipient = user1 if user1.username.lower(
-                ) == message['recipient'].lower() else user2
+    return chat_messages
 
-            if 'createdAt' in message:
-                created_at = parser.parse(message['createdAt'])
 
-            if 'seen' in message:
-                seen = True if message['seen'] else False
+# Finish the flush of a chat room, keeping it pending if messages were buffered while flushing
+def release_flush(chat_room_name, username1, username2):
+    keys = [
+        message_store_key(chat_room_name), PENDING_FLUSH_KEY,
+        flush_pending_key(chat_room_name)
+    ]
 
-            if 'content' in message:
-                content = message['content']
+    release_flush_script(keys=keys,
+                         args=[pending_flush_member(username1, username2)])
 
-            chat_message = ChatMessage(message_type=message_type,
-                                       sender=sender,
-                                       recipient=recipient,
-                                       created_at=created_at,
-                                       seen=seen,
-                                       content=content,
-                                       chat_room=chat_room)
 
-            is_valid_type = False
+# Update db with the buffered messages after the chat room's high-water mark by running the celery task
+@app.task
+def update_chat_db(username1, username2):
+
+    chat_room_name = get_chat_room_name(username1, username2)
+
+    user1 = User.objects.filter(username=username1).first()
 
-            for allowed_type in MESSAGE_TYPE:
-                if allowed_type[0].lower() == message_type.lower():
-                    is_valid_type = True
-                    break
+    user2 = User.objects.filter(username=username2).first()
 
-            if is_valid_type == False:
-                continue
+    if user1 is None or user2 is None:
+        redis.delete(message_store_key(chat_room_name),
+                     seen_key(chat_room_name))
+        release_flush(chat_room_name, username1, username2)
+        return
 
-            chat_message.full_clean()
+    if user1.username > user2.username:
+        user1, user2 = user2, user1
+
+    chat_room, _ = ChatRoom.objects.get_or_create(
+        chat_room_name=chat_room_name,
+        defaults={
+            'user1': user1,
+            'user2': user2
+        })
+
+    with transaction.atomic():
+        # lock the chat room so that the messages after the high-water mark are written exactly once
+        chat_room = ChatRoom.objects.select_for_update().get(pk=chat_room.pk)
+
+        start = '-' if chat_room.last_flushed_id is None else next_stream_id(
+            chat_room.last_flushed_id)
+
+        pipe = redis.pipeline(transaction=False)
+        pipe.xrange(message_store_key(chat_room_name), min=start, max='+')
+        pipe.hgetall(seen_key(chat_room_name))
+        entries = decode_entries(*pipe.execute())
+
+        if len(entries) > 0:
+            chat_messages = ChatMessage.objects.bulk_create(
+                build_chat_messages([message for _, message in entries],
+                                    chat_room, user1, user2),
+                batch_size=settings.CHAT_DB_BATCH_SIZE)
+
+            update_fields = ['last_flushed_id']
+
+            chat_room.last_flushed_id = entries[-1][0]
+
+            if len(chat_messages) > 0:
+                chat_room.last_chat_message = chat_messages[-1]
+                update_fields.append('last_chat_message')
+
+            chat_room.save(update_fields=update_fields)
+
+    if chat_room.last_flushed_id is not None:
+        redis.xtrim(message_store_key(chat_room_name),
+                    minid=next_stream_id(chat_room.last_flushed_id))
+
+    release_flush(chat_room_name, username1, username2)
+
+
+# Queue flushes of the chat rooms whose oldest buffered message is older than `CHAT_FLUSH_MAX_AGE` seconds
+@app.task
+def flush_chat_rooms():
 
-            chat_message.save()
+    members = redis.zrangebyscore(PENDING_FLUSH_KEY, '-inf',
+                                  time.time() - settings.CHAT_FLUSH_MAX_AGE)
 
-            last_chat_message = chat_message
+    for member in members:
+        username1, username2 = fast_json.loads(member)
 
-        except Exception as error:
-            print(error)
+        chat_room_name = get_chat_room_name(username1, username2)
 
-    if last_chat_message is not None:
-        chat_room.last_chat_message = last_chat_message
-        chat_room.save()
\ No newline at end of file
+        if redis.set(flush_pending_key(chat_room_name),
+                     1,
+                     nx=True,
+                     ex=settings.CHAT_FLUSH_TIMEOUT):
+            update_chat_db.delay(username1, username2)
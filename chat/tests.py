@@ -0,0 +1,77 @@
+from datetime import date
+
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from accounts.models import User
+
+from chat.models import ChatMessage, ChatRoom, TEXT
+from chat.stores import get_chat_room_name
+from chat.views import get_chat_feed
+
+
+class ChatFeedTests(TestCase):
+    """
+    Checks that the chat feed is read in a fixed number of queries
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='owner',
+                                       password='!',
+                                       first_name='first',
+                                       last_name='last',
+                                       gender='female',
+                                       date_of_birth=date(1990, 1, 1))
+
+    def create_chat_rooms(self, count):
+        others = User.objects.bulk_create([
+            User(username='other{0}_{1}'.format(count, i),
+                 password='!',
+                 first_name='first',
+                 last_name='last',
+                 gender='male',
+                 date_of_birth=date(1990, 1, 1)) for i in range(count)
+        ])
+
+        chat_rooms = ChatRoom.objects.bulk_create([
+            ChatRoom(chat_room_name=get_chat_room_name(self.user.username,
+                                                       other.username),
+                     user1=self.user,
+                     user2=other) for other in others
+        ])
+
+        messages = ChatMessage.objects.bulk_create([
+            ChatMessage(message_type=TEXT,
+                        sender=other,
+                        recipient=self.user,
+                        content='message',
+                        chat_room=chat_room)
+            for chat_room, other in zip(chat_rooms, others)
+        ])
+
+        for chat_room, message in zip(chat_rooms, messages):
+            chat_room.last_chat_message = message
+
+        ChatRoom.objects.bulk_update(chat_rooms, ['last_chat_message'])
+
+    def get_chat_feed(self):
+        request = APIRequestFactory().get('/get-chat-feed/', {'limit': 1000})
+        force_authenticate(request, user=self.user)
+
+        return get_chat_feed(request)
+
+    def test_query_count_does_not_grow_with_chat_rooms(self):
+        self.create_chat_rooms(10)
+
+        # count of the chat rooms and the page with their users and last messages
+        with self.assertNumQueries(2):
+            response = self.get_chat_feed()
+
+        self.assertEqual(len(response.data), 10)
+
+        self.create_chat_rooms(990)
+
+        with self.assertNumQueries(2):
+            response = self.get_chat_feed()
+
+        self.assertEqual(len(response.data), 1000)
@@ -1,24 +1,27 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
 from django.shortcuts import get_object_or_404
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from django.db.models import Q
+from django.db.models import F, Q
 
 from accounts.models import User
 
 from chat.models import ChatMessage, ChatRoom
 
-from chat.pagination import ChatMessagePagination
+from chat.pagination import ChatMessageCursorPagination, ChatMessagePagination, ChatRoomPagination
 
-from chat.serializers import ChatMessageSerializer, ChatRoomSerializer
+from chat.serializers import CHAT_MESSAGE_VALUES, ChatRoomSerializer, serialize_chat_message_values
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_chat_messages(request, *args, **kwargs):
     """
-    Gets unread (with additional) chat messages of a chat room
+    Gets unread (with additional) chat messages of a chat room. \n
+    Pages through the history by cursor if `before` or `after` is provided.
     """
 
     other_user = request.query_params.get('other_user')
@@ -35,26 +38,28 @@ def get_chat_messages(request, *args, **kwargs):
 
     chat_room = ChatRoom.objects.filter(chat_room_name=chat_room_name).first()
 
-    serializer_context = {
-        'request': request,
-    }
+    data = ChatMessage.objects.filter(chat_room=chat_room).values(
+        *CHAT_MESSAGE_VALUES)
+
+    if 'before' in request.query_params or 'after' in request.query_params:
+        paginator = ChatMessageCursorPagination()
+        result = paginator.paginate_queryset(data, request)
+
+        return paginator.get_paginated_response(
+            serialize_chat_message_values(result))
 
-    data = ChatMessage.objects.filter(
-        chat_room=chat_room).order_by('-created_at')
     paginator = ChatMessagePagination()
-    result = paginator.paginate_queryset(data, request)
-    serializer = ChatMessageSerializer(result,
-                                       many=True,
-                                       context=serializer_context)
+    result = paginator.paginate_queryset(data.order_by('-created_at'),
+                                         request)
 
-    return Response(serializer.data)
+    return Response(serialize_chat_message_values(result))
 
 
 @api_view(['PUT'])
 @permission_classes([IsAuthenticated])
 def mark_chat_message_as_seen(request, *args, **kwargs):
     """
-    Marks all unread chat messages stored in database of a chat room as seen
+    Marks all unread chat messages received by current `User` stored in database of a chat room as seen and returns their count
     """
 
     try:
@@ -73,12 +78,16 @@ def mark_chat_message_as_seen(request, *args, **kwargs):
 
         chat_room = get_object_or_404(ChatRoom, chat_room_name=chat_room_name)
 
-        chat_messages = ChatMessage.objects.filter(chat_room=chat_room,
-                                                   seen=False)
+        count = ChatMessage.objects.filter(chat_room=chat_room,
+                                           recipient=current_user,
+                                           seen=False).update(seen=True)
 
-        for chat_message in chat_messages:
-            chat_message.seen = True
-            chat_message.save()
+        if count > 0:
+            async_to_sync(get_channel_layer().group_send)(
+                chat_room_name, {
+                    'type': 'update',
+                    'seen': current_user.username
+                })
 
     except KeyError:
         return Response('Please provide the other user of the chat room',
@@ -87,14 +96,14 @@ def mark_chat_message_as_seen(request, *args, **kwargs):
         return Response('Sorry, something went wrong. Please try again later',
                         status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    return Response(status=status.HTTP_204_NO_CONTENT)
+    return Response(count)
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_chat_feed(request, *args, **kwargs):
     """
-    Gets the chat feed of a user
+    Gets the chat feed of a user ordered by the latest chat message
     """
 
     user = request.user
@@ -106,7 +115,12 @@ def get_chat_feed(request, *args, **kwargs):
         'request': request,
     }
 
-    result = ChatRoom.objects.filter(Q(user1=user) | Q(user2=user))
+    data = ChatRoom.objects.filter(Q(user1=user) | Q(user2=user)).select_related(
+        'user1', 'user2', 'last_chat_message__sender',
+        'last_chat_message__recipient').order_by(
+            F('last_chat_message__created_at').desc(nulls_last=True), '-id')
+    paginator = ChatRoomPagination()
+    result = paginator.paginate_queryset(data, request)
     serializer = ChatRoomSerializer(result,
                                     many=True,
                                     context=serializer_context)
@@ -4,14 +4,14 @@ from channels.middleware import BaseMiddleware
 from urllib.parse import parse_qs
 import jwt
 
-from accounts.models import User
+from accounts import user_cache
 
 from DatingAppBackend import settings
 
 
 @database_sync_to_async
 def get_user(user_id):
-    user = User.objects.filter(id=user_id).first()
+    user = user_cache.get_user(user_id)
     return user if user is not None and user.is_active else AnonymousUser()
 
 
@@ -34,7 +34,15 @@ class JwtTokenAuthMiddleware(BaseMiddleware):
         except:
             user_id = None
 
-        scope['user'] = AnonymousUser() if user_id is None else await get_user(
-            user_id)
+        if user_id is None:
+            scope['user'] = AnonymousUser()
+        else:
+            # skip the thread hop when the user is cached in process
+            user = user_cache.get_local_user(user_id)
+
+            if user is None:
+                scope['user'] = await get_user(user_id)
+            else:
+                scope['user'] = user if user.is_active else AnonymousUser()
 
         return await super().__call__(scope, receive, send)
\ No newline at end of file